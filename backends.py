@@ -0,0 +1,221 @@
+import time
+
+from errors import *
+from contents import get_gscholar_contents, parse_gscholar_contents, get_gscholar_first, parse_gscholar_first, parse_gscholar_result
+from readiness import PageState, wait_for_gscholar, READY_TIMEOUT
+from metrics import metrics, import_module
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.169 Safari/537.36"
+TIMEOUT = 30 # Seconds.
+
+# Bytes transferred for the page and its assets, by the Resource Timing API.
+# Cross-origin assets without a Timing-Allow-Origin header count as 0 bytes.
+PAGE_BYTES_SCRIPT = '''
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+for (var i = 0; i < entries.length; i++) bytes += entries[i].transferSize || 0;
+return bytes;
+'''
+
+class Backend(object):
+    '''
+    Interface of a Google Scholar backend.
+
+    "load" requests a search results page, raising LoadError if it cannot be requested (e.g., a connection error),
+    and "contents" returns the first contents row (or every row if not "first")
+    of the page loaded, raising RobotError, AQError or SearchError as get_gscholar_contents does,
+    or LoadError if the page did not load in time.
+    "first_result" returns the title, the authors snippet and the citations count of the first search result only,
+    with the same exceptions, through a faster path (see parse_gscholar_first).
+    "page_stats" returns the bytes transferred and the seconds taken to load the page read last.
+    "captcha_solved" is called once the user solved a captcha, and returns whether the page must be loaded again
+    (otherwise the page solved is read as it is).
+    '''
+
+    def load(self, url):
+        raise NotImplementedError()
+
+    def contents(self, first=True):
+        raise NotImplementedError()
+
+    def first_result(self):
+        return parse_gscholar_result(self.contents(first=True))
+
+    def page_stats(self):
+        return None
+
+    def captcha_solved(self):
+        return False
+
+    def close(self):
+        pass
+
+class SeleniumBackend(Backend):
+    '''
+    Google Scholar backend driving a Chrome window.
+    The contents are read as soon as the page shows its outcome (see readiness.py), waiting at most "ready_timeout" seconds.
+
+    Requests matching "blocked_urls" (see browser.py) are blocked, except while a captcha is shown.
+    A Chrome the driver is "attached" to (see browser.setup_driver) is left running on close.
+    '''
+
+    def __init__(self, driver, ready_timeout=READY_TIMEOUT, blocked_urls=None, attached=False):
+        self.driver = driver
+        self.attached = attached
+        self.ready_timeout = ready_timeout
+        self.blocked_urls = blocked_urls or []
+        self.blocking = False
+        self.started_at = None
+        self.stats = None
+
+        if self.blocked_urls:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+
+    def load(self, url):
+        if self.blocked_urls and not self.blocking:
+            self.block(self.blocked_urls)
+
+        from selenium.common.exceptions import TimeoutException
+
+        self.started_at = time.time()
+        try:
+            self.driver.get(url)
+        except TimeoutException as e:
+            raise LoadError(url, e.msg)
+
+    def contents(self, first=True):
+        self.ready()
+        return get_gscholar_contents(self.driver, first)
+
+    def first_result(self):
+        self.ready()
+        return get_gscholar_first(self.driver)
+
+    def ready(self):
+        '''Wait for the page loaded, raising the exception of its outcome unless it shows search results.'''
+        with metrics.span('ready'):
+            state = wait_for_gscholar(self.driver, self.ready_timeout)
+        self.stats = (self.driver.execute_script(PAGE_BYTES_SCRIPT), time.time() - self.started_at)
+
+        if state is PageState.CAPTCHA:
+            if self.blocking:
+                # Show the captcha in full.
+                self.block([])
+                self.driver.refresh()
+            raise RobotError()
+        elif state is PageState.AUTOMATED_QUERIES:
+            raise AQError()
+        elif state is PageState.EMPTY:
+            raise SearchError()
+        elif state is PageState.TIMEOUT:
+            raise LoadError(self.driver.current_url)
+
+    def page_stats(self):
+        return self.stats
+
+    def block(self, urls):
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': urls})
+        self.blocking = len(urls) > 0
+
+    def close(self):
+        if self.attached:
+            # Stop the chromedriver only.
+            self.driver.service.stop()
+        else:
+            self.driver.quit()
+
+class HTTPBackend(Backend):
+    '''
+    Google Scholar backend sending plain HTTP requests through a pooled session.
+
+    The browser is only used when Google Scholar asks for a captcha:
+    a Chrome window is set up with "setup_driver" (if given) and loads the same page so that the user can solve it there.
+    The cookies of the browser are then copied to the session, and the next page is requested over HTTP again.
+    Without "setup_driver", the captcha is left to the user (e.g., in a browser on the same network),
+    and the page is requested again once it is solved (see captcha_solved).
+    '''
+
+    def __init__(self, setup_driver=None, timeout=TIMEOUT, attached=False):
+        requests = import_module('requests')
+        self.request_error = requests.RequestException
+        self.session = requests.Session()
+        self.session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=1))
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=1))
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept-Language': 'en'})
+
+        self.setup_driver = setup_driver
+        self.timeout = timeout
+        self.attached = attached
+        self.browser = None
+        self.in_browser = False
+        self.captcha = False # Captcha page read without a browser.
+        self.url = None
+        self.html = None
+        self.stats = None
+
+    def load(self, url):
+        self.url = url
+        self.in_browser = False
+        self.captcha = False
+
+        started_at = time.time()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except self.request_error as e:
+            raise LoadError(url, type(e).__name__)
+        self.html = response.content
+        self.stats = (len(self.html), time.time() - started_at)
+
+    def contents(self, first=True):
+        return self.read(lambda browser: browser.contents(first), lambda html: parse_gscholar_contents(html, first))
+
+    def first_result(self):
+        return self.read(lambda browser: browser.first_result(), parse_gscholar_first)
+
+    def read(self, read_browser, parse):
+        '''Read the page loaded with "parse", or with "read_browser" while in the browser for a captcha.'''
+        if self.in_browser:
+            try:
+                contents = read_browser(self.browser)
+            except SearchError:
+                self.leave_browser()
+                raise
+
+            self.leave_browser()
+            return contents
+
+        try:
+            return parse(self.html)
+
+        except RobotError:
+            if self.setup_driver is None:
+                self.captcha = True
+                raise
+
+            # Fall back to the browser for the captcha.
+            if self.browser is None:
+                self.browser = SeleniumBackend(self.setup_driver(), attached=self.attached)
+            self.browser.load(self.url)
+            self.in_browser = True
+            raise
+
+    def page_stats(self):
+        if self.in_browser:
+            return self.browser.page_stats()
+
+        return self.stats
+
+    def captcha_solved(self):
+        # A captcha read without a browser was solved elsewhere: the page is requested again.
+        return self.captcha
+
+    def leave_browser(self):
+        '''Take the cookies of the browser back to the session once the captcha is solved.'''
+        for cookie in self.browser.driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.in_browser = False
+
+    def close(self):
+        self.session.close()
+        if self.browser is not None:
+            self.browser.close()
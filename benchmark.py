@@ -0,0 +1,474 @@
+import os, sys, json, gzip, time, random, hashlib, argparse, datetime, subprocess
+import threading
+import tracemalloc
+import http.server
+from urllib.parse import quote, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import contents
+from contents import get_cvpr, get_iccv, get_icml, get_nips, get_iclr, get_icra, get_eccv
+from contents import get_gscholar_contents, parse_gscholar_contents, parse_gscholar_result, get_gscholar_first, parse_gscholar_first, find_gscholar_row, get_citations
+from fetch import Fetcher, ProceedingsCache
+from backends import HTTPBackend
+from scholar import GSCHOLAR_URL
+
+# Default Parameters
+FIXTURES_DIR = './benchmarks/fixtures'
+RESULTS_PATH = './benchmarks/results.jsonl'
+REPEAT = 3 # Runs of each benchmark. The fastest is reported.
+REGRESSION = 0.2 # Relative slowdown (or growth of peak memory) against the previous result reported as a regression.
+BACKENDS = ['html.parser', 'lxml']
+
+PARSERS = {'CVPR': (get_cvpr, 2019), # Parser and year of each proceedings benchmark.
+           'ICCV': (get_iccv, 2019),
+           'ICML': (get_icml, 2020),
+           'NeurIPS': (get_nips, 2020),
+           'ICLR': (get_iclr, 2020),
+           'ICRA': (get_icra, 2020),
+           'ECCV': (get_eccv, 2020)}
+SCHOLAR_QUERY = 'Deep+Residual+Learning+for+Image+Recognition'
+SCHOLAR_PAGE_URL = GSCHOLAR_URL.format(mirror='com', query=SCHOLAR_QUERY, num=10)
+SCHOLAR_CHECK_URL = GSCHOLAR_URL.format(mirror='com', query='synthetic+{}', num=1) # Synthetic outcomes checked by check_first.
+
+class Fixtures(object):
+    '''Recorded pages by URL, saved as gzipped files in a directory with an "index.json".'''
+
+    def __init__(self, dirname=FIXTURES_DIR):
+        self.dirname = dirname
+        self.index_path = os.path.join(dirname, 'index.json')
+        self.index = {}
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, 'r') as f:
+                self.index = json.load(f)
+
+    def save(self, url, body):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        url = requests.utils.requote_uri(url) # As sent by requests.
+        filename = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.gz'
+        with gzip.open(os.path.join(self.dirname, filename), 'wb') as f:
+            f.write(body)
+        self.index[url] = filename
+
+    def load(self, url):
+        filename = self.index.get(requests.utils.requote_uri(url))
+        if filename is None:
+            return None
+
+        with gzip.open(os.path.join(self.dirname, filename), 'rb') as f:
+            return f.read()
+
+    def close(self):
+        if not os.path.isdir(self.dirname):
+            os.makedirs(self.dirname)
+        with open(self.index_path, 'w') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+
+class FixtureServer(object):
+    '''Local stand-in HTTP server answering every recorded URL with its fixture, at "{base}/{quoted URL}".'''
+
+    def __init__(self, fixtures):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = fixtures.load(unquote(self.path[1:]))
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def mount(self, session):
+        '''Send every request of a requests session to the server.'''
+        adapter = FixtureAdapter(self.base)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FixtureAdapter(HTTPAdapter):
+    def __init__(self, base):
+        super().__init__()
+        self.base = base
+
+    def send(self, request, **kwargs):
+        request.url = '{}/{}'.format(self.base, quote(request.url, safe=''))
+        return super().send(request, **kwargs)
+
+class FixtureDriver(object):
+    '''Stand-in for a Chrome window showing a page, for get_gscholar_contents and get_gscholar_first.'''
+
+    def __init__(self, html):
+        self.html = html.decode('utf-8') if isinstance(html, bytes) else html
+
+    def execute_script(self, script):
+        if 'outerHTML' in script:
+            return find_gscholar_row(self.html)
+        return self.html
+
+def measure(func, repeat):
+    '''Run "func" (returning a number of items) "repeat" times. Returns the items, the fastest seconds and the peak memory in bytes.'''
+    best = None
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        items = func()
+        seconds = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        best = seconds if best is None else min(best, seconds)
+
+    return items, best, peak
+
+def count_papers(parser, year, fetcher):
+    return sum(len(authors) for authors, titles, links in parser(year, fetcher))
+
+def run_benchmarks(fixtures, backends=BACKENDS, repeat=REPEAT):
+    '''Run every benchmark with each BeautifulSoup backend installed. Returns a list of results.'''
+    server = FixtureServer(fixtures)
+    results = []
+
+    html = fixtures.load(SCHOLAR_PAGE_URL)
+    http_backend = HTTPBackend()
+    server.mount(http_backend.session)
+
+    def scholar_http():
+        http_backend.load(SCHOLAR_PAGE_URL)
+        http_backend.contents(first=False)
+        return 1
+
+    def scholar_http_first():
+        http_backend.load(SCHOLAR_PAGE_URL)
+        http_backend.first_result()
+        return 1
+
+    for backend in backends:
+        try:
+            from bs4 import BeautifulSoup
+            BeautifulSoup('', backend)
+        except Exception:
+            print("Skipping {} (not installed).".format(backend))
+            continue
+
+        contents.HTML_PARSER = backend
+        benchmarks = []
+        for name, (parser, year) in PARSERS.items():
+            fetcher = Fetcher()
+            server.mount(fetcher.session)
+            benchmarks.append((name, lambda parser=parser, year=year, fetcher=fetcher: count_papers(parser, year, fetcher)))
+
+        if html is not None:
+            benchmarks.append(('Scholar (parse)', lambda: parse_gscholar_contents(html, False) and 1))
+            benchmarks.append(('Scholar (driver)', lambda: get_gscholar_contents(FixtureDriver(html), False) and 1))
+            benchmarks.append(('Scholar (http)', scholar_http))
+            benchmarks.append(('Scholar (first)', lambda: parse_gscholar_first(html) and 1))
+            benchmarks.append(('Scholar (first, driver)', lambda: get_gscholar_first(FixtureDriver(html)) and 1))
+            benchmarks.append(('Scholar (first, http)', scholar_http_first))
+
+        for name, func in benchmarks:
+            try:
+                items, seconds, peak = measure(func, repeat)
+            except Exception as e:
+                print("{} ({}): {}".format(name, backend, e))
+                continue
+            results.append({'benchmark': name, 'backend': backend, 'items': items, 'seconds': seconds,
+                            'throughput': items / seconds, 'peak_mb': peak / 2**20})
+
+    if html is not None:
+        # Regular expressions only; no parser backend.
+        divs = [str(div) for div in parse_gscholar_contents(html, False)]
+        items, seconds, peak = measure(lambda: sum(1 for div in divs * 100 if get_citations(div) is not None), repeat)
+        results.append({'benchmark': 'get_citations', 'backend': '-', 'items': items, 'seconds': seconds,
+                        'throughput': items / seconds, 'peak_mb': peak / 2**20})
+
+    contents.HTML_PARSER = 'html.parser'
+    http_backend.close()
+    server.close()
+
+    return results
+
+def check_first(fixtures, backends=BACKENDS):
+    '''
+    Check that the fast path for the first search result (parse_gscholar_first) reads every saved Google Scholar page
+    as the soup path does (parse_gscholar_contents and parse_gscholar_result), with each BeautifulSoup backend installed:
+    the same result, or the same exception. Returns the number of mismatches.
+    '''
+    n_mismatches = 0
+    for backend in backends:
+        try:
+            from bs4 import BeautifulSoup
+            BeautifulSoup('', backend)
+        except Exception:
+            continue
+
+        contents.HTML_PARSER = backend
+        for url in sorted(fixtures.index):
+            if 'scholar.google' not in url:
+                continue
+
+            html = fixtures.load(url)
+            fast = outcome(lambda: parse_gscholar_first(html))
+            soup = outcome(lambda: parse_gscholar_result(parse_gscholar_contents(html, True)))
+            if fast != soup:
+                print("MISMATCH {} ({}): {!r} (first) != {!r} (soup)".format(url, backend, fast, soup))
+                n_mismatches += 1
+
+    contents.HTML_PARSER = 'html.parser'
+    return n_mismatches
+
+def outcome(func):
+    '''Return the result of "func", or the type of the exception it raised.'''
+    try:
+        return func()
+    except Exception as e:
+        return type(e)
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def track(results, path=RESULTS_PATH, threshold=REGRESSION):
+    '''
+    Append the results to the history at "path" and compare them with the previous result of each benchmark and backend.
+    Returns the number of regressions.
+    '''
+    previous = {}
+    if os.path.isfile(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    previous[(record['benchmark'], record['backend'])] = record
+
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    commit = git_commit()
+
+    n_regressions = 0
+    print("{:<24} {:<12} {:>8} {:>14} {:>10} {:>10}".format('Benchmark', 'Backend', 'Items', 'Items/s', 'Peak MB', 'Change'))
+    for result in results:
+        prev = previous.get((result['benchmark'], result['backend']))
+        change = ''
+        if prev is not None:
+            change = '{:+.0f}%'.format((result['throughput'] / prev['throughput'] - 1) * 100)
+            if result['throughput'] < prev['throughput'] * (1 - threshold) or result['peak_mb'] > prev['peak_mb'] * (1 + threshold):
+                change += ' REGRESSION'
+                n_regressions += 1
+
+        print("{:<24} {:<12} {:>8d} {:>14.1f} {:>10.2f} {:>10}".format(
+            result['benchmark'], result['backend'], result['items'], result['throughput'], result['peak_mb'], change))
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with open(path, 'a') as f:
+        for result in results:
+            f.write(json.dumps(dict(result, time=now, commit=commit, python=sys.version.split()[0])) + '\n')
+
+    return n_regressions
+
+def record(fixtures):
+    '''Record the pages of every benchmark from the web.'''
+    tmp_path = os.path.join(fixtures.dirname, 'record.sqlite')
+    cache = ProceedingsCache(tmp_path)
+    fetcher = Fetcher(cache)
+
+    for name, (parser, year) in PARSERS.items():
+        print("Recording {} {}...".format(name, year))
+        fetcher.visited = []
+        count_papers(parser, year, fetcher)
+        for url in fetcher.visited:
+            fixtures.save(url, cache.get_page(url)[2])
+
+    print("Recording Google Scholar results...")
+    backend = HTTPBackend()
+    backend.load(SCHOLAR_PAGE_URL)
+    fixtures.save(SCHOLAR_PAGE_URL, backend.html)
+    backend.close()
+
+    cache.conn.close()
+    os.remove(tmp_path)
+
+def synthesize(fixtures, n_papers=1000, seed=0):
+    '''
+    Write synthetic pages for every benchmark, in the markup of each site with "n_papers" papers per conference.
+    For machines that cannot reach the sites; recorded pages are preferred.
+    '''
+    rng = random.Random(seed)
+    words = ['deep', 'learning', 'neural', 'network', 'graph', 'vision', 'robust', 'efficient', 'transformer', 'attention',
+             'segmentation', 'detection', 'generative', 'adversarial', 'representation', 'reinforcement', 'policy', 'sparse']
+    names = ['Kim', 'Lee', 'Park', 'Smith', 'Zhang', 'Wang', 'Müller', 'García', 'Rossi', 'Tanaka', 'Nguyen', 'Cohen']
+
+    def title():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(4, 10))).capitalize()
+
+    def authors():
+        return ['{} {}'.format(chr(rng.randint(65, 90)), rng.choice(names)) for _ in range(rng.randint(1, 8))]
+
+    def cvf(conference, year, n_days):
+        main = ['<html><body><div id="content"><dl>']
+        for day in range(n_days):
+            href = '{}{}?day={}-06-{:02d}'.format(conference, year, year, 16 + day)
+            main.append('<dd><a href="{}">Day {}: {}-06-{:02d}</a></dd>'.format(href, day + 1, year, 16 + day))
+
+        pages = []
+        for day in range(max(n_days, 1)):
+            page = ['<html><body><div id="content"><dl>']
+            for i in range(n_papers // max(n_days, 1)):
+                name = 'Paper_{}_{}'.format(day, i)
+                paper_title = title()
+                page.append('<dt class="ptitle"><br><a href="content_{}_{}/html/{}_{}_{}_paper.html">{}</a></dt>'.format(
+                    conference, year, name, conference, year, paper_title))
+                page.append('<dd><form class="authsearch"><a href="#">{}</a></form></dd>'.format('</a>, <a href="#">'.join(authors())))
+                page.append('<dd>[<a href="content_{}_{}/papers/{}.pdf">pdf</a>]<div class="bibref">@InProceedings{{{},<br>\n'
+                            'author = {{{}}},\ntitle = {{{}}},<br>\nbooktitle = {{{}}},<br>\nyear = {{{}}}\n}}</div></dd>'.format(
+                                conference, year, name, name, ' and '.join(authors()), paper_title, conference, year))
+            page.append('</dl></div></body></html>')
+            pages.append(''.join(page))
+
+        main_url = 'https://openaccess.thecvf.com/{}{}.py'.format(conference, year)
+        if n_days == 0:
+            fixtures.save(main_url, pages[0])
+            return
+
+        main.append('</dl></div></body></html>')
+        fixtures.save(main_url, ''.join(main))
+        for day in range(n_days):
+            fixtures.save('https://openaccess.thecvf.com/{}{}?day={}-06-{:02d}'.format(conference, year, year, 16 + day), pages[day])
+
+    def dblp(toc):
+        url = "https://dblp.org/search/publ/api?q=toc%3Adb/{}.bht%3A&f={}&h=1000&format=json"
+        hits = [{'info': {'title': 'Proceedings', 'venue': toc}}] # The conference itself, without authors.
+        for i in range(n_papers):
+            names = authors()
+            author = [{'@pid': str(j), 'text': name} for j, name in enumerate(names)]
+            hits.append({'info': {'authors': {'author': author[0] if len(author) == 1 else author},
+                                  'title': title() + '.', 'ee': 'https://doi.org/10.1109/{}.{}'.format(toc.replace('/', '.'), i)}})
+
+        for first in range(0, len(hits), 1000):
+            page = {'result': {'hits': {'@total': str(len(hits)), 'hit': hits[first:first + 1000]}}}
+            fixtures.save(url.format(toc, first), json.dumps(page))
+
+    cvf('CVPR', 2019, 3)
+    cvf('ICCV', 2019, 0)
+    dblp('conf/iclr/iclr2020')
+    dblp('conf/icra/icra2020')
+
+    icml = ['<html><body><div class="wrapper">']
+    for i in range(n_papers):
+        icml.append('<div class="paper"><p class="title">{}</p><p class="details"><span class="authors">{}</span>; '
+                    'Proceedings of the 37th International Conference on Machine Learning, PMLR 119:{}-{}</p>'
+                    '<p class="links">[<a href="http://proceedings.mlr.press/v119/paper{}a.html">abs</a>]'
+                    '[<a href="http://proceedings.mlr.press/v119/paper{}a/paper{}a.pdf">Download PDF</a>]</p></div>'.format(
+                        title(), ',\xa0'.join(authors()), i * 10, i * 10 + 9, i, i, i))
+    icml.append('</div></body></html>')
+    fixtures.save('http://proceedings.mlr.press/v119', ''.join(icml))
+
+    nips = ['<html><body><ul><li><a href="/">Home</a></li></ul><div class="container"><ul>']
+    for i in range(n_papers):
+        nips.append('<li><a href="/paper/2020/hash/{:032x}-Abstract.html">{}</a> <i>{}</i></li>'.format(rng.getrandbits(128), title(), ', '.join(authors())))
+    nips.append('</ul></div></body></html>')
+    fixtures.save('https://papers.nips.cc/paper/2020', ''.join(nips))
+
+    n_volumes = 10
+    eccv = ['<html><body><ul class="publ-list">']
+    for volume in range(n_volumes):
+        eccv.append('<li class="entry editor" id="conf/eccv/2020-{}"><nav class="publ"><ul><li class="ee"><a href="https://doi.org/10.1007/978-3-030-{:05d}-{}">'
+                    'electronic edition</a></li></ul></nav><cite><span class="title">Computer Vision - ECCV 2020 - 16th European Conference, Part {}</span></cite></li>'.format(
+                        volume + 1, 58452 + volume, volume, volume + 1))
+    eccv.append('<li class="entry editor" id="conf/eccv/2020w-1"><nav class="publ"><ul><li class="ee"><a href="https://doi.org/10.1007/978-3-030-66415-2">'
+                'electronic edition</a></li></ul></nav><cite><span class="title">Computer Vision - ECCV 2020 Workshops, Part I</span></cite></li>')
+    eccv.append('</ul></body></html>')
+    fixtures.save('https://dblp.org/db/conf/eccv/index.html', ''.join(eccv))
+
+    for volume in range(n_volumes):
+        springer = ['<html><body><ol class="content-type-list">']
+        for i in range(n_papers // n_volumes):
+            springer.append('<li class="chapter-item content-type-list__item"><div class="content-type-list__meta">'
+                            '<div class="content-type-list__text" data-test="author-text">{}</div></div>'
+                            '<a class="content-type-list__link u-interface-link" href="/chapter/10.1007/978-3-030-{:05d}-{}_{}">{}</a></li>'.format(
+                                ', '.join(authors()), 58452 + volume, volume, i + 1, title()))
+        springer.append('</ol></body></html>')
+        fixtures.save('https://doi.org/10.1007/978-3-030-{:05d}-{}'.format(58452 + volume, volume), ''.join(springer))
+
+    scholar = ['<html><head><style>{}</style><script>{}</script></head><body><div id="gs_hdr"><form id="gs_hdr_frm"><input name="q"></form></div><div id="gs_res_ccl_mid">'.format(
+        '.gs_r{margin:0} ' * 2000, 'var x = 0; ' * 2000)]
+    for i in range(10):
+        scholar.append('<div class="gs_r gs_or gs_scl" data-cid="{:x}"><div class="gs_ri"><h3 class="gs_rt">{}<a href="https://example.org/{}">{}</a></h3>'
+                       '<div class="gs_a">{} - Proceedings of the IEEE conference, 2016 - example.org</div>'
+                       '<div class="gs_rs">{}</div><div class="gs_fl"><a href="#">Save</a> <a href="#">Cite</a> '
+                       '<a href="/scholar?cites={}&amp;as_sdt=2005&amp;sciodt=0,5&amp;hl=en">Cited by {}</a> '
+                       '<a href="#">Related articles</a> <a href="#">All {} versions</a></div></div></div>'.format(
+                           rng.getrandbits(64), '<span class="gs_ctc"><span class="gs_ct1">[PDF]</span></span> ' if i % 3 == 0 else '', i, title(),
+                           ', '.join(authors()[:4]), ' '.join(rng.choice(words) for _ in range(40)),
+                           rng.getrandbits(60), rng.randint(0, 100000), rng.randint(2, 40)))
+    scholar.append('</div></body></html>')
+    fixtures.save(SCHOLAR_PAGE_URL, ''.join(scholar))
+
+    # Other outcomes of a search, for check_first. The scripts of a results page may mention the keywords of a captcha.
+    row = ('<div class="gs_r gs_or gs_scl"><div class="gs_ri"><h3 class="gs_rt"><a href="#">{}</a></h3><div class="gs_a">{} - 2020</div>'
+           '<div class="gs_fl"><a href="/scholar?cites=1">Cited by 42</a></div></div></div>').format(title(), ', '.join(authors()))
+    pages = {'result': row,
+             'script': '<script>var help = "Please show you\'re {}";</script>{}'.format(contents.ROBOT_KW[1], row),
+             'empty': '<div class="gs_r">Your search did not match any articles. {}.</div>'.format(contents.EMPTY_KW[1]),
+             'captcha': '<form id="gs_captcha_f"><h1>Please show you\'re {}</h1></form>'.format(contents.ROBOT_KW[1]),
+             'automated': '<h1>We\'re sorry...</h1><p>... but {} ...</p>'.format(contents.ERROR_KW[0]),
+             'none': '<p>Nothing here.</p>'}
+    for name, page in pages.items():
+        fixtures.save(SCHOLAR_CHECK_URL.format(name), '<html><head><script>var x = 0;</script></head><body>{}</body></html>'.format(page))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the proceedings parsers and the Google Scholar result path against saved pages.')
+    parser.add_argument('command', type=str, choices=['run', 'record', 'synthesize'], help='"record" saves the pages from the web, "synthesize" writes synthetic pages instead, and "run" benchmarks against the saved pages.')
+    parser.add_argument('--fixtures', type=str, default=FIXTURES_DIR, help='Directory of the saved pages. (Default: {})'.format(FIXTURES_DIR))
+    parser.add_argument('--results', type=str, default=RESULTS_PATH, help='Path of the results history. (Default: {})'.format(RESULTS_PATH))
+    parser.add_argument('--backends', type=str, default=','.join(BACKENDS), help='Comma-separated BeautifulSoup backends to compare. (Default: {})'.format(','.join(BACKENDS)))
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Runs of each benchmark; the fastest is reported. (Default: {})'.format(REPEAT))
+    parser.add_argument('--papers', type=int, default=1000, help='Papers per conference with "synthesize". (Default: 1000)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error if any benchmark regressed.')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.fixtures):
+        os.makedirs(args.fixtures)
+    fixtures = Fixtures(args.fixtures)
+
+    if args.command == 'record':
+        record(fixtures)
+        fixtures.close()
+
+    elif args.command == 'synthesize':
+        synthesize(fixtures, args.papers)
+        fixtures.close()
+
+    else:
+        if not fixtures.index:
+            parser.error("No saved pages in {}. Run \"record\" or \"synthesize\" first.".format(args.fixtures))
+
+        results = run_benchmarks(fixtures, args.backends.split(','), args.repeat)
+        n_regressions = track(results, args.results)
+        n_mismatches = check_first(fixtures, args.backends.split(','))
+        if n_mismatches > 0:
+            print("{:d} pages read differently by the fast path for the first search result.".format(n_mismatches))
+        if (n_regressions > 0 and args.fail_on_regression) or n_mismatches > 0:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import os, json, time
+
+from backends import USER_AGENT
+
+# Default Parameters
+DRIVER_CACHE_PATH = './temp/chromedriver.json' # Path of the chromedriver binary installed last.
+DRIVER_MAX_AGE = 7 # Days until the chromedriver binary is checked against the Chrome version again.
+
+# URL patterns blocked in the lean mode, by category (see Network.setBlockedURLs of the Chrome DevTools Protocol).
+# Captcha assets (www.google.com/recaptcha, www.gstatic.com/recaptcha) are never blocked by host,
+# and every pattern is lifted while a captcha is shown (see SeleniumBackend).
+BLOCKLIST = {'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico'],
+             'css': ['*.css'],
+             'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*fonts.googleapis.com*', '*fonts.gstatic.com*'],
+             'scripts': ['*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*', '*googlesyndication.com*', '*apis.google.com*']}
+BLOCK = ['images', 'css', 'fonts', 'scripts']
+
+def blocked_urls(block=BLOCK):
+    '''URL patterns to block for the categories in "block".'''
+    return [pattern for category in block for pattern in BLOCKLIST[category]]
+
+_driver_path = None # chromedriver binary checked in this process.
+
+def install_chromedriver(force=False, cache_path=DRIVER_CACHE_PATH, max_age=DRIVER_MAX_AGE):
+    '''
+    Put a chromedriver binary matching Chrome on PATH.
+    The binary installed last is reused for "max_age" days without checking the Chrome version (or for good with "max_age" None),
+    and the check is done once per process. Returns the path of the binary.
+    '''
+    global _driver_path
+    if _driver_path is not None and not force:
+        return _driver_path
+
+    cached = None
+    if not force and os.path.isfile(cache_path):
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+
+        expired = max_age is not None and time.time() - cached['checked_at'] > max_age * 86400
+        if expired or not os.path.isfile(cached['path']):
+            cached = None
+
+    if cached is not None:
+        path = cached['path']
+        dirname = os.path.dirname(path)
+        if dirname not in os.environ.get('PATH', '').split(os.pathsep):
+            os.environ['PATH'] = dirname + os.pathsep + os.environ.get('PATH', '')
+
+    else:
+        import chromedriver_autoinstaller
+        path = chromedriver_autoinstaller.install()
+
+        dirname = os.path.dirname(cache_path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(cache_path, 'w') as f:
+            json.dump({'path': path, 'checked_at': time.time()}, f)
+
+    _driver_path = path
+    return path
+
+def setup_driver(lean=False, headless=False, profile_dir=None, debugger_address=None):
+    '''
+    Start a Chrome window controlled by Selenium.
+
+    In the "lean" mode, the window returns from a page load as soon as the document is parsed ("eager" page-load strategy),
+    which is all the readiness checks need (see readiness.py). Assets are blocked by SeleniumBackend.
+    In the "headless" mode, no window is shown; captchas cannot be solved then.
+
+    With "profile_dir", Chrome keeps its profile (and the Google Scholar cookies earned by solving captchas) there across runs.
+    With "debugger_address" (e.g., "127.0.0.1:9222"), the driver attaches to a Chrome already running
+    with "--remote-debugging-port" instead of starting one; the other options are then set by that Chrome.
+    '''
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        install_chromedriver()
+
+    except Exception as e:
+        print(e)
+        print("Please install selenium and chromedriver_autoinstaller.")
+
+    print('Loading...')
+    chrome_options = Options()
+
+    if debugger_address is not None:
+        chrome_options.add_experimental_option("debuggerAddress", debugger_address)
+        if lean:
+            chrome_options.page_load_strategy = 'eager'
+
+        return start_driver(chrome_options)
+
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument("window-size=1280,800")
+    chrome_options.add_argument("user-agent={}".format(USER_AGENT))
+
+    if lean:
+        chrome_options.page_load_strategy = 'eager'
+
+    if headless:
+        chrome_options.add_argument("--headless=new")
+
+    if profile_dir is not None:
+        chrome_options.add_argument("--user-data-dir={}".format(os.path.abspath(profile_dir)))
+
+    driver = start_driver(chrome_options)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+    return driver
+
+def start_driver(chrome_options):
+    '''Start the driver, checking the chromedriver binary again if it does not match Chrome (e.g., after a Chrome update).'''
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+
+    try:
+        return webdriver.Chrome(options=chrome_options)
+    except SessionNotCreatedException:
+        install_chromedriver(force=True)
+        return webdriver.Chrome(options=chrome_options)
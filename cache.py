@@ -0,0 +1,90 @@
+import os, time
+import sqlite3
+import threading
+
+from contents import normalize_title
+
+# Default Parameters
+CACHE_PATH = './temp/citations.sqlite'
+CACHE_TTL = 30 # Days until a cached citation count is considered stale.
+FAILED_ETC = ['No Search Results', 'No Matching Result'] # Prefixes of the "Etc" of lookups that found no count.
+
+def is_failed(etc):
+    return any((etc or '').startswith(prefix) for prefix in FAILED_ETC)
+
+class CitationCache(object):
+    '''
+    Persistent citation cache backed by SQLite.
+
+    Each row is keyed by the proceedings link and the normalized title of a paper,
+    and stores the citation count, the "Etc" log, the fetch timestamp and the Google Scholar mirror used.
+    A row older than the TTL is ignored on lookup, so that the paper is queried again.
+    Lookups that found no count (see FAILED_ETC) are not stored, nor read back from older caches:
+    a paper Google Scholar has not indexed yet is queried again on the next run, instead of being kept at 0 citations.
+    Every count stored is also kept in the "history" table, for the refresh scheduler (see refresh.py).
+    '''
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS citations ("
+                          "link TEXT PRIMARY KEY, title TEXT, citations INTEGER, etc TEXT, "
+                          "fetched_at REAL, mirror TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS citations_title ON citations (title)")
+
+        migrate = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'history'").fetchone() is None
+        self.conn.execute("CREATE TABLE IF NOT EXISTS history (link TEXT, title TEXT, citations INTEGER, fetched_at REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS history_link ON history (link)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS history_title ON history (title)")
+        if migrate:
+            # Caches from before the history table start their history with their current counts.
+            self.conn.execute("INSERT INTO history SELECT link, title, citations, fetched_at FROM citations")
+        self.conn.commit()
+
+    def lookup(self, link, title):
+        '''Return (citations, etc) of a fresh cache entry matching the link or the title, otherwise None.'''
+        row = self.latest(link, title)
+        if row is None:
+            return None
+
+        if self.ttl is not None and time.time() - row[2] > self.ttl * 86400:
+            # Stale entry.
+            return None
+
+        return row[0], row[1]
+
+    def latest(self, link, title):
+        '''Return (citations, etc, fetched_at) of the cache entry matching the link or the title, however old, otherwise None.'''
+        failed = ''.join(" AND COALESCE(etc, '') NOT LIKE ?" for _ in FAILED_ETC)
+        with self.lock:
+            return self.conn.execute("SELECT citations, etc, fetched_at FROM citations WHERE (link = ? OR title = ?)" + failed +
+                                     " ORDER BY fetched_at DESC LIMIT 1",
+                                     [link, normalize_title(title)] + [prefix + '%' for prefix in FAILED_ETC]).fetchone()
+
+    def history(self, link, title):
+        '''Return every (fetched_at, citations) stored for the link or the title, oldest first.'''
+        with self.lock:
+            return self.conn.execute("SELECT fetched_at, citations FROM history WHERE link = ? OR title = ? ORDER BY fetched_at",
+                                     (link, normalize_title(title))).fetchall()
+
+    def store(self, link, title, citations, etc, mirror):
+        '''Insert or refresh the cache entry for a paper, and add the count to its history, unless the lookup failed.'''
+        if is_failed(etc):
+            return
+
+        fetched_at = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO citations (link, title, citations, etc, fetched_at, mirror) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (link, normalize_title(title), citations, etc, fetched_at, mirror))
+            self.conn.execute("INSERT INTO history (link, title, citations, fetched_at) VALUES (?, ?, ?, ?)",
+                              (link, normalize_title(title), citations, fetched_at))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
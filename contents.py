@@ -1,49 +1,180 @@
 import re
+import html as htmllib
 import time
-
-from bs4 import BeautifulSoup
-import requests
+import json
+import itertools
+import unicodedata
 
 from errors import *
+from fetch import Fetcher, PROCEEDINGS_MAX_AGE
+from metrics import metrics, import_module
+from papers import PaperTable
 
 ERROR_KW = ['your computer or network may be sending automated queries']
 ROBOT_KW = ['unusual traffic from your computer network', 'not a robot', '로봇']
 EMPTY_KW = ["정보가 없습니다", "no information is available"]
-
-def get_element(driver, xpath, attempts=5, _count=0):
-    '''Safe get_element method with multiple attempts'''
-    try:
-        element = driver.find_element_by_xpath(xpath)
-        return element
-    except Exception as e:
-        if _count<attempts:
-            sleep(1)
-            get_element(driver, xpath, attempts=attempts, _count=_count+1)
-        else:
-            print("Element not found")
-
-def get_gscholar_contents(driver):
-    '''Inspect Google Scholar search results with exception handling.'''
-    el = get_element(driver, "/html/body")
-
-    if any(kw in el.text for kw in ROBOT_KW):
+HTML_PARSER = 'html.parser' # BeautifulSoup parser backend, e.g. "lxml" if installed.
+
+# Patterns of the fast path for the first search result (see parse_gscholar_first).
+def class_pattern(tag, cls):
+    '''Pattern of the start tag of an element with a class, like the CSS selector "tag.cls".'''
+    return re.compile(r"""<{}\b[^>]*?\bclass\s*=\s*["'](?:[^"']*\s)?{}(?:\s[^"']*)?["'][^>]*>""".format(tag, cls), re.I)
+
+GS_R_PATTERN = class_pattern('div', 'gs_r') # Contents row.
+GS_RT_PATTERN = class_pattern('h3', 'gs_rt') # Title.
+GS_A_PATTERN = class_pattern('div', 'gs_a') # Authors snippet.
+LINK_PATTERN = re.compile(r"<a\b[^>]*>(.*?)</a\s*>", re.I | re.S)
+HIDDEN_PATTERN = re.compile(r"<(script|style)\b.*?</\1\s*>", re.I | re.S) # Left out of the text like BeautifulSoup.get_text.
+TAG_PATTERN = re.compile(r"<[^>]*>")
+BODY_PATTERN = re.compile(r"<body\b", re.I)
+
+def check_gscholar_text(text):
+    '''Raise an exception if the text of a Google Scholar page asks for a captcha or reports automated queries.'''
+    if any(kw in text for kw in ROBOT_KW):
         # Solve Captcha
         raise RobotError()
     
-    elif any(kw in el.text for kw in ERROR_KW):
+    elif any(kw in text for kw in ERROR_KW):
         # Replace the Google Scholar base URL
         raise AQError()
 
-    c = el.get_attribute('innerHTML').encode('utf-8')
-    soup = BeautifulSoup(c, 'html.parser')
-    div = soup.findAll("div", { "class" : "gs_r" })[0] # The first contents row.
+def find_gscholar_result(soup, first=True):
+    '''Return the first contents row (or every row if not "first") in the soup of Google Scholar search results.'''
+    divs = soup.findAll("div", { "class" : "gs_r" })
+    div = divs[0] # The first contents row.
 
     if any(kw in div.text for kw in EMPTY_KW):
         # Empty Search Results
         raise SearchError()
 
-    return div
+    return div if first else divs
+
+def get_gscholar_contents(driver, first=True):
+    '''
+    Inspect Google Scholar search results in a Chrome window with exception handling.
+    The page must be ready (see readiness.py).
+    '''
+    html = driver.execute_script("return document.body.innerHTML")
+
+    return parse_gscholar_contents(html, first)
+
+def get_gscholar_first(driver):
+    '''
+    Return the title, the authors snippet and the citations count of the first search result in a Chrome window.
+    Only the first contents row is moved out of the browser. The page must be ready (see readiness.py).
+    '''
+    div = driver.execute_script("var row = document.querySelector('div.gs_r'); return row === null ? null : row.outerHTML;")
+    if div is None:
+        raise IndexError("No contents row.")
+
+    return parse_gscholar_row(div)
+
+@metrics.timed('parse')
+def parse_gscholar_first(html):
+    '''
+    Return the title, the authors snippet and the citations count of the first search result in the raw HTML of Google Scholar search results,
+    with the same exception handling as parse_gscholar_contents.
+    The page is scanned with regular expressions, without building a soup.
+    '''
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', 'replace')
+
+    body = BODY_PATTERN.search(html)
+    text = TAG_PATTERN.sub('', HIDDEN_PATTERN.sub('', html[body.start():] if body is not None else html))
+    check_gscholar_text(text)
+
+    div = find_gscholar_row(html)
+    if div is None:
+        raise IndexError("No contents row.")
+
+    return parse_gscholar_row(div)
+
+def find_element(html, pattern, tag='div'):
+    '''
+    Find the first element whose start tag matches "pattern" in "html", balancing the nested "tag" elements.
+    Returns the start of the element, the start and the end of its inner HTML, or None.
+    '''
+    res = pattern.search(html)
+    if res is None:
+        return None
+
+    depth = 0
+    for tag_ in re.finditer(r"<(/?){}\b".format(tag), html[res.start():], re.I):
+        depth += -1 if tag_.group(1) else 1
+        if depth == 0:
+            return res.start(), res.end(), res.start() + tag_.start()
+
+    return res.start(), res.end(), len(html)
 
+def make_soup(markup):
+    '''Parse HTML with BeautifulSoup and the HTML_PARSER backend. bs4 is imported on the first page parsed.'''
+    return import_module('bs4').BeautifulSoup(markup, HTML_PARSER)
+
+def html_text(html):
+    '''Text of an HTML fragment, as BeautifulSoup.get_text returns it.'''
+    return htmllib.unescape(TAG_PATTERN.sub('', HIDDEN_PATTERN.sub('', html)))
+
+def find_gscholar_row(html):
+    '''Return the HTML of the first contents row (div.gs_r) of a page, or None.'''
+    element = find_element(html, GS_R_PATTERN)
+    if element is None:
+        return None
+
+    start, _, end = element
+    close = html.find('>', end)
+    return html[start:close + 1 if close >= 0 else len(html)]
+
+def parse_gscholar_row(html):
+    '''
+    Parse the title, the authors snippet and the citations count in the HTML of a contents row, as parse_gscholar_result does,
+    raising SearchError for empty search results.
+    '''
+    if any(kw in html_text(html) for kw in EMPTY_KW):
+        # Empty Search Results
+        raise SearchError()
+
+    title = ""
+    title_el = find_element(html, GS_RT_PATTERN, 'h3')
+    if title_el is not None:
+        inner = html[title_el[1]:title_el[2]]
+        link_el = LINK_PATTERN.search(inner)
+        title = html_text(link_el.group(1) if link_el is not None else inner)
+        title = re.sub(r"^(\[[^\]]*\]\s*)+", "", title.strip()) # Drop tags such as [PDF], [CITATION].
+
+    authors = ""
+    authors_el = find_element(html, GS_A_PATTERN)
+    if authors_el is not None:
+        authors = html_text(html[authors_el[1]:authors_el[2]]).split(" - ")[0]
+
+    return title, authors, get_citations(html)
+
+@metrics.timed('parse')
+def parse_gscholar_contents(html, first=True):
+    '''Inspect the raw HTML of Google Scholar search results with exception handling.'''
+    soup = make_soup(html)
+    body = soup.body if soup.body is not None else soup
+    for hidden in body.find_all(['script', 'style']):
+        # Left out of the text checked, as in parse_gscholar_first, whatever the version of BeautifulSoup.
+        hidden.decompose()
+    check_gscholar_text(body.get_text())
+
+    return find_gscholar_result(body, first)
+
+def parse_gscholar_result(div):
+    '''Parse the title, the authors snippet and the citations count in a Google Scholar search result.'''
+    title_el = div.select_one("h3.gs_rt")
+    title = ""
+    if title_el is not None:
+        link_el = title_el.select_one("a")
+        title = (link_el if link_el is not None else title_el).get_text()
+        title = re.sub(r"^(\[[^\]]*\]\s*)+", "", title.strip()) # Drop tags such as [PDF], [CITATION].
+
+    authors_el = div.select_one("div.gs_a")
+    authors = authors_el.get_text().split(" - ")[0] if authors_el is not None else ""
+
+    return title, authors, get_citations(str(div))
+
+@metrics.timed('citations')
 def get_citations(s):
     '''Parse the citations count in a Google Scholar search result.'''
     out = 0
@@ -67,8 +198,23 @@ def removeDigits(s):
 
     return result
 
-def get_papers_list(conference, year):
-    '''Helper function to link papers parser for each conference defined.'''
+def normalize_title(s):
+    '''Normalize a paper title into a lowercase, punctuation-free key.'''
+    s = unicodedata.normalize('NFKD', s)
+    s = ''.join(i for i in s if not unicodedata.combining(i))
+    s = re.sub(r"[^0-9a-z]+", " ", s.lower())
+
+    return s.strip()
+
+def iter_papers_list(conference, year, fetcher=None, max_age=PROCEEDINGS_MAX_AGE):
+    '''
+    Helper function to link papers parser for each conference defined.
+    Yields (authors, titles, links) of the papers in chunks, as soon as each proceedings page is parsed.
+
+    With a cache attached to the fetcher, a parsed listing younger than "max_age" days is yielded at once without any request.
+    An older one is revalidated with conditional GETs on the pages it was parsed from, and parsed again only if any has changed.
+    In offline mode, the cached listing is always yielded.
+    '''
     conference_dict = {'CVPR': get_cvpr,
                        'ICCV': get_iccv,
                        'ICLR': get_iclr,
@@ -76,99 +222,122 @@ def get_papers_list(conference, year):
                        'ECCV': get_eccv,
                        'NeurIPS': get_nips,
                        'ICRA': get_icra}
-    
-    return conference_dict[conference](year)
 
-def get_cvpr(year):
+    if fetcher is None:
+        fetcher = Fetcher()
+
+    cache = fetcher.cache
+    if cache is not None:
+        listing = cache.get_listing(conference, year)
+        if listing is not None:
+            authors, titles, links, urls, fetched_at = listing
+            if fetcher.offline or time.time() - fetched_at < max_age * 86400:
+                metrics.count('listing_cache_hits')
+                yield authors, titles, links
+                return
+
+            if not fetcher.any_modified(urls):
+                cache.touch_listing(conference, year)
+                metrics.count('listing_cache_hits')
+                yield authors, titles, links
+                return
+
+    fetcher.visited = []
+    papers = PaperTable()
+    for authors, titles, links in conference_dict[conference](year, fetcher):
+        papers.extend(authors, titles, links) # Raises ValueError on a misaligned chunk.
+        yield authors, titles, links
+
+    if cache is not None:
+        cache.put_listing(conference, year, papers.authors, papers.titles, papers.links, fetcher.visited)
+
+def get_papers_list(conference, year, fetcher=None, max_age=PROCEEDINGS_MAX_AGE):
+    '''Return every paper in a conference-year as a PaperTable (see iter_papers_list).'''
+    papers = PaperTable()
+    for authors, titles, links in iter_papers_list(conference, year, fetcher, max_age):
+        papers.extend(authors, titles, links)
+
+    return papers
+
+def get_cvf(conference, year, fetcher):
+    '''
+    CVF open access parser.
+    This yields titles, authors, links for the papers of a conference at the CVF foundation site, page by page.
+    '''
+    soup = make_soup(fetcher.get("https://openaccess.thecvf.com/{}{}.py".format(conference, year)))
+
+    pages = [soup]
+    if len(soup.select("dt.ptitle")) == 0:
+        # Some proceedings are organized by its poster date.
+        # The following loop iterates thorough each day, whose pages are fetched concurrently.
+        day_links = ["https://openaccess.thecvf.com/{}".format(date_soup.select_one("a").get("href")) for date_soup in soup.select("dd")]
+        pages = (make_soup(page) for page in fetcher.iter_many(day_links))
+
+    pattern = "author = {(.*?)},\ntitle = {(.*?)},"
+    for soup in pages:
+        link_psoup = soup.select("dt.ptitle") # Soup containing titles and links
+        cit_psoup = soup.select("div.bibref") # Soup containing authors
+
+        titles = [paper_.select_one("a").text for paper_ in link_psoup]
+        links = ["https://openaccess.thecvf.com/{}".format(paper_.select_one("a").get("href")) for paper_ in link_psoup]
+
+        bibrefs = [re.search(pattern, paper_.text, re.S).groups() for paper_ in cit_psoup]
+        authors = [bibref[0] for bibref in bibrefs]
+        if [normalize_title(i[1]) for i in bibrefs] != [normalize_title(i) for i in titles]:
+            # A title without its BibTeX entry (or the other way around) shifts the lists. Pair them by title instead.
+            by_title = dict((normalize_title(bibref[1]), bibref[0]) for bibref in bibrefs)
+            authors = [by_title.get(normalize_title(title), "") for title in titles]
+            metrics.count('misaligned_pages')
+
+        yield authors, titles, links
+
+def get_cvpr(year, fetcher):
     '''
     CVPR papers parser.
-    This gathers a list of titles, authors, links for CVPR papers at the CVF foundation site.
+    This yields titles, authors, links for CVPR papers at the CVF foundation site.
     '''
 
     if year < 2013 or year > 2020:
         # There are CVPR events happened prior to 2013. However, the CVF site only supports those since 2013.
         # TODO: Support CVPR < 2013.
         raise ValueError("Year must be in [2013, ..., 2020] for CVPR.")
-    
-    session = requests.Session()
-    page = session.get("https://openaccess.thecvf.com/CVPR{}.py".format(year))
-    soup = BeautifulSoup(page.content, 'html.parser')
-
-    link_psoup = soup.select("dt.ptitle") # Soup containing titles and links
-    cit_psoup = soup.select("div.bibref") # Soup containing authors
-    if len(link_psoup) == 0:
-        # Some CVPR proceedings are organized by its poster date.
-        # The following loop iterates thorough each day.
-        for date_soup in soup.select("dd"):
-            href = date_soup.select_one("a").get("href")
-            page = session.get("https://openaccess.thecvf.com/{}".format(href))
-            soup = BeautifulSoup(page.content, 'html.parser')
-
-            link_psoup += soup.select("dt.ptitle")
-            cit_psoup += soup.select("div.bibref")
-
-    pattern = "author = {(.*?)},\ntitle"
-    authors = [re.search(pattern, paper_.text).group(1) for paper_ in cit_psoup]
-    titles = [paper_.select_one("a").text for paper_ in link_psoup]
-    links = ["https://openaccess.thecvf.com/{}".format(paper_.select_one("a").get("href")) for paper_ in link_psoup]
-
-    return authors, titles, links
-
-def get_iccv(year):
+
+    return get_cvf('CVPR', year, fetcher)
+
+def get_iccv(year, fetcher):
     '''
     ICCV papers parser.
-    This gathers a list of titles, authors, links for ICCV papers at the CVF foundation site.
+    This yields titles, authors, links for ICCV papers at the CVF foundation site.
     '''
     if year not in [2013, 2015, 2017, 2019]:
         # There are ICCV events happened prior to 2013. However, the CVF site only supports those since 2013.
         # TODO: Support ICCV < 2013.
         raise ValueError("Year must be in [2013, 2015, 2017, 2019] for ICCV.")
-    
-    session = requests.Session()
-    page = session.get("https://openaccess.thecvf.com/ICCV{}.py".format(year))
-    soup = BeautifulSoup(page.content, 'html.parser')
-
-    link_psoup = soup.select("dt.ptitle") # Soup containing titles and links
-    cit_psoup = soup.select("div.bibref") # Soup containing authors
-    if len(link_psoup) == 0:
-        # Some ICCV proceedings are organized by its poster date.
-        # The following loop iterates thorough each day.
-        for date_soup in soup.select("dd"):
-            href = date_soup.select_one("a").get("href")
-            page = session.get("https://openaccess.thecvf.com/{}".format(href))
-            soup = BeautifulSoup(page.content, 'html.parser')
-
-            link_psoup += soup.select("dt.ptitle")
-            cit_psoup += soup.select("div.bibref")
-
-    pattern = "author = {(.*?)},\ntitle"
-    authors = [re.search(pattern, paper_.text).group(1) for paper_ in cit_psoup]
-    titles = [paper_.select_one("a").text for paper_ in link_psoup]
-    links = ["https://openaccess.thecvf.com/{}".format(paper_.select_one("a").get("href")) for paper_ in link_psoup]
-
-    return authors, titles, links
-
-def get_icra(year):
+
+    return get_cvf('ICCV', year, fetcher)
+
+def get_dblp(toc, fetcher):
     '''
-    ICRA papers parser.
-    This gathers a list of titles, authors, links for ICRA papers at the DBLP library.
+    DBLP table of contents parser.
+    This yields titles, authors, links for the papers in a DBLP table of contents (e.g., "conf/iclr/iclr2020"), 1,000 at a time.
     '''
-    if year < 1984 or year > 2020:
-        raise ValueError("Year must be in [2013, ..., 2020] for ICLR.")
-    
-    authors = []
-    titles = []
-    links = []
-    
-    first = 0
-    total = 1
-    while first < total: # DBLP returns 1,000 papers at a query. Repeat queries until every papers are collected.
-        results =  requests.get("https://dblp.org/search/publ/api?q=toc%3Adb/conf/icra/icra{}.bht%3A&f={}&h=1000&format=json".format(year, first)).json()
-        
-        papers = results['result']['hits']['hit']
+    url = "https://dblp.org/search/publ/api?q=toc%3Adb/{}.bht%3A&f={}&h=1000&format=json"
+
+    # DBLP returns 1,000 papers at a query. The first query tells the total,
+    # and the queries for the rest of papers are sent concurrently.
+    result = fetcher.get_json(url.format(toc, 0))
+    total = int(result['result']['hits']['@total'])
+    results = itertools.chain([result], (json.loads(page) for page in fetcher.iter_many(url.format(toc, first) for first in range(1000, total, 1000))))
+
+    for result in results:
+        authors = []
+        titles = []
+        links = []
+
+        papers = result['result']['hits'].get('hit', [])
         for paper in papers:
             if 'authors' not in paper['info'].keys():
-                # No author: This object describes the ICLR conference itself.
+                # No author: This object describes the conference itself.
                 continue
 
             if type(paper['info']['authors']['author']) == dict:
@@ -181,106 +350,65 @@ def get_icra(year):
 
             titles.append(paper['info']['title'])
             links.append(paper['info']['ee'])
-        
-        first += 1000
-        total = int(results['result']['hits']['@total'])
-    
-    return authors, titles, links
 
-def get_iclr(year):
+        yield authors, titles, links
+
+def get_icra(year, fetcher):
+    '''
+    ICRA papers parser.
+    This yields titles, authors, links for ICRA papers at the DBLP library.
+    '''
+    if year < 1984 or year > 2020:
+        raise ValueError("Year must be in [2013, ..., 2020] for ICLR.")
+
+    return get_dblp("conf/icra/icra{}".format(year), fetcher)
+
+def get_iclr(year, fetcher):
     '''
     ICLR papers parser.
-    This gathers a list of titles, authors, links for ICLR papers at the DBLP library.
+    This yields titles, authors, links for ICLR papers at the DBLP library.
     '''
     if year < 2013 or year > 2020:
         raise ValueError("Year must be in [2013, ..., 2020] for ICLR.")
-    
-    authors = []
-    titles = []
-    links = []
-
-    first = 0
-    total = 1
-    while first < total: # DBLP returns 1,000 papers at a query. Repeat queries until every papers are collected.
-        results =  requests.get("https://dblp.org/search/publ/api?q=toc%3Adb/conf/iclr/iclr{}.bht%3A&f={}&h=1000&format=json".format(year, first)).json()
-        
-        papers = results['result']['hits']['hit']
-        for paper in papers:
-            if 'authors' not in paper['info'].keys():
-                # No author: This object describes the ICLR conference itself.
-                continue
-
-            if type(paper['info']['authors']['author']) == dict:
-                # A single author case.
-                authors.append(removeDigits(paper['info']['authors']['author']['text']).strip())
-            
-            else:
-                # Multiple authors case.
-                authors.append(', '.join(removeDigits(i['text']).strip() for i in paper['info']['authors']['author']))
 
-            titles.append(paper['info']['title'])
-            links.append(paper['info']['ee'])
-        
-        first += 1000
-        total = int(results['result']['hits']['@total'])
-    
-    return authors, titles, links
+    return get_dblp("conf/iclr/iclr{}".format(year), fetcher)
 
-def get_eccv(year):
+def get_eccv(year, fetcher):
     '''
     ECCV papers parser.
     
-    This gathers a list of titles, authors, links for ECCV papers using the combination
+    This yields titles, authors, links for ECCV papers using the combination
     of the DBLP library and Springer proceedings page.
 
     This first gathers the list of links to Springer proceedings pages for ECCV proceedings.
     (Note that ECCV proceedings consists of multiple partitions with 30~40 papers in each.)
 
-    Threading module then simultaneously gather authors, titles, links to the papers from every Springer proceedings pages.
+    The fetcher then concurrently gathers authors, titles, links to the papers from every Springer proceedings pages,
+    which are yielded volume by volume.
     '''
-    from threading import Thread
-
     if year not in [int(1990 + 2*x) for x in range(16)]:
             raise ValueError("Year must be in [1990, 1992, 1994, ..., 2020] for ECCV.")
     
-    page = requests.get("https://dblp.org/db/conf/eccv/index.html") # DBLP page for ECCV proceedings.
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = make_soup(fetcher.get("https://dblp.org/db/conf/eccv/index.html")) # DBLP page for ECCV proceedings.
     year_soup = soup.select("li[id^='conf/eccv/{}']".format(year)) # Gather ECCV proceedings at year.
 
-    def get_proc(proc_link, results):
-        page = requests.get(proc_link)
+    proc_links = [soup_.select_one("li.ee").select_one("a").get("href") # Links to the Springer proceedings.
+                  for soup_ in year_soup if 'Workshop' not in soup_.select_one("span.title").text] # Exclude workshop papers.
 
-        proc_soup = BeautifulSoup(page.content, 'html.parser')
+    for page in fetcher.iter_many(proc_links):
+        proc_soup = make_soup(page)
         paper_soup = proc_soup.select("li.chapter-item.content-type-list__item") # Rows of papers
 
         authors = [i.select_one("div.content-type-list__text[data-test='author-text']").text for i in paper_soup]
         titles = [i.select_one("a.content-type-list__link.u-interface-link").text for i in paper_soup]
         links = ["https://link.springer.com{}".format(i.select_one("a.content-type-list__link.u-interface-link").get("href")) for i in paper_soup]
 
-        results.append([authors, titles, links])
-
-    results = []
-    ths = []
-    for soup_ in year_soup:
-        if 'Workshop' not in soup_.select_one("span.title").text: # Exclude workshop papers.
-            proc_link = soup_.select_one("li.ee").select_one("a").get("href") # A link to the Springer proceedings.
-            th = Thread(target=get_proc, args=(proc_link, results)) # Multithreading to speed-up the process.
-            th.start()
-            ths.append(th)
-    
-    for th in ths:
-        th.join()
-
-    authors = [j for i in results for j in i[0]]
-    titles = [j for i in results for j in i[1]]
-    links = [j for i in results for j in i[2]]
-
-    return authors, titles, links
+        yield authors, titles, links
 
-def get_icml(year):
+def get_icml(year, fetcher):
     '''
     ICML papers parser.
-    This gathers a list of titles, authors, links for ICML papers at the PMLR site.
+    This yields titles, authors, links for ICML papers at the PMLR site.
     '''
     if year < 2013 or year > 2020:
         # There are ICML events happened prior to 2013. However, the PMLR site only supports those since 2013.
@@ -296,25 +424,23 @@ def get_icml(year):
                  2014: 'v32',
                  2013: 'v28'}
 
-    page = requests.get('http://proceedings.mlr.press/{}'.format(pmlr_dict[year]))
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = make_soup(fetcher.get('http://proceedings.mlr.press/{}'.format(pmlr_dict[year])))
 
     authors = [i.select('span.authors')[0].text.replace(u'\xa0', u' ') for i in soup.select('p.details')]
     titles = [i.text for i in soup.select('p.title')]
     links = [i.select_one("a[href*='html']").get('href') for i in soup.select('p.links')]
 
-    return authors, titles, links
+    return iter([(authors, titles, links)])
 
-def get_nips(year):
+def get_nips(year, fetcher):
     '''
     NeurIPS papers parser.
-    This gathers a list of titles, authors, links for NeurIPS papers at the official NeurIPS site.
+    This yields titles, authors, links for NeurIPS papers at the official NeurIPS site.
     '''
     if year < 1987 or year > 2020:
         raise ValueError("Year must be in [1987, ..., 2020] for NeurIPS.")
 
-    page = requests.get('https://papers.nips.cc/paper/{}'.format(year))
-    soup = BeautifulSoup(page.content, 'html.parser')
+    soup = make_soup(fetcher.get('https://papers.nips.cc/paper/{}'.format(year)))
 
     list_papers_soup = soup.select("ul")[1].select("li") # Rows containing each paper.
     
@@ -322,4 +448,4 @@ def get_nips(year):
     titles = [paper_.select_one("a").text for paper_ in list_papers_soup]
     links = ["https://papers.nips.cc{}".format(paper_.select_one("a").get("href")) for paper_ in list_papers_soup]
 
-    return authors, titles, links
\ No newline at end of file
+    return iter([(authors, titles, links)])
@@ -0,0 +1,148 @@
+import os, re, gzip, argparse
+import sqlite3
+import xml.etree.ElementTree as ET
+from html.entities import name2codepoint
+
+from contents import removeDigits
+
+# Default Parameters
+DBLP_INDEX_PATH = './temp/dblp_index.sqlite'
+BATCH_SIZE = 10000 # Number of papers inserted at once while building the index.
+
+VENUE_DICT = {'NeurIPS': 'nips'} # DBLP venue keys differing from the lowercase conference name.
+RECORD_TAGS = ['article', 'inproceedings', 'proceedings', 'book', 'incollection', 'phdthesis', 'mastersthesis', 'www', 'data']
+MAIN_PROCEEDINGS = re.compile(r"^conf/[^/]+/\d{4}(-\d+)?$") # e.g., "conf/cvpr/2020", "conf/eccv/2020-1". Excludes workshops.
+
+def dblp_venue(conference):
+    '''DBLP venue key of a conference (e.g., "NeurIPS" -> "nips").'''
+    return VENUE_DICT.get(conference, conference.lower())
+
+def parse_inproceedings(elem):
+    '''Parse (venue, year, authors, title, link) of an "inproceedings" record, or None if not in the main proceedings.'''
+    key = elem.get('key', '')
+    crossref = elem.findtext('crossref') or ''
+    year = elem.findtext('year')
+    if not key.startswith('conf/') or not MAIN_PROCEEDINGS.match(crossref) or not year:
+        return None
+
+    authors = ', '.join(removeDigits(''.join(i.itertext())).strip() for i in elem.findall('author'))
+    if not authors:
+        # No author: This object describes the conference itself.
+        return None
+
+    title_el = elem.find('title')
+    title = ''.join(title_el.itertext()).strip().rstrip('.') if title_el is not None else ''
+    link = elem.findtext('ee') or 'https://dblp.org/rec/{}'.format(key)
+
+    return key.split('/')[1], int(year), authors, title, link
+
+def iter_dblp_papers(dump_path):
+    '''
+    Stream the papers in the main proceedings of conferences from a DBLP XML dump (dblp.xml or dblp.xml.gz).
+    Yields (venue, year, authors, title, link) for each paper.
+
+    This iterates over the dump with constant memory, clearing each record once parsed.
+    The named character entities declared in dblp.dtd are resolved with the HTML entities.
+    '''
+    opener = gzip.open if dump_path.endswith('.gz') else open
+
+    parser = ET.XMLParser()
+    parser.entity.update((name, chr(codepoint)) for name, codepoint in name2codepoint.items())
+
+    with opener(dump_path, 'rb') as f:
+        context = ET.iterparse(f, events=('start', 'end'), parser=parser)
+        _, root = next(context)
+
+        for event, elem in context:
+            if event != 'end' or elem.tag not in RECORD_TAGS:
+                continue
+
+            if elem.tag == 'inproceedings':
+                paper = parse_inproceedings(elem)
+                if paper is not None:
+                    yield paper
+
+            root.clear() # Drop the parsed records.
+
+class DBLPIndex(object):
+    '''
+    Per-venue/year index of conference papers built from a DBLP XML dump, backed by SQLite.
+    Once built, it answers get_papers_list for any DBLP-covered conference and year without any network.
+    The index is only created with "create" (to build it). Otherwise, ValueError is raised if it is missing or empty.
+    '''
+
+    def __init__(self, path=DBLP_INDEX_PATH, create=False):
+        self.path = path
+        if not create:
+            if not os.path.isfile(path):
+                raise ValueError("No DBLP index at {}. Build it with dblp_xml.py first.".format(path))
+
+            self.conn = sqlite3.connect(path)
+            try:
+                n_rows = self.conn.execute("SELECT EXISTS (SELECT 1 FROM papers)").fetchone()[0]
+            except sqlite3.DatabaseError:
+                n_rows = 0
+            if not n_rows:
+                self.conn.close()
+                raise ValueError("The DBLP index at {} is empty or invalid. Build it with dblp_xml.py first.".format(path))
+            return
+
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS papers (venue TEXT, year INTEGER, authors TEXT, title TEXT, link TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS papers_venue_year ON papers (venue, year)")
+        self.conn.commit()
+
+    def build(self, dump_path, batch_size=BATCH_SIZE):
+        '''Rebuild the index from a DBLP XML dump. Returns the number of papers indexed.'''
+        self.conn.execute("DELETE FROM papers")
+
+        n_papers = 0
+        rows = []
+        for row in iter_dblp_papers(dump_path):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                n_papers += self._insert(rows)
+                rows = []
+        n_papers += self._insert(rows)
+
+        return n_papers
+
+    def get_papers_list(self, conference, year):
+        '''Return authors, titles, links of the papers of a conference-year, in the order of the dump.'''
+        rows = self.conn.execute("SELECT authors, title, link FROM papers WHERE venue = ? AND year = ? ORDER BY rowid",
+                                 (dblp_venue(conference), year)).fetchall()
+        if len(rows) == 0:
+            raise ValueError("No {} {} papers in the DBLP index.".format(conference, year))
+
+        authors = [i[0] for i in rows]
+        titles = [i[1] for i in rows]
+        links = [i[2] for i in rows]
+
+        return authors, titles, links
+
+    def close(self):
+        self.conn.close()
+
+    def _insert(self, rows):
+        self.conn.executemany("INSERT INTO papers (venue, year, authors, title, link) VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+        return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a per-venue/year index of conference papers from a DBLP XML dump.')
+    parser.add_argument('dump', type=str, help='Path to the DBLP XML dump (dblp.xml or dblp.xml.gz from https://dblp.org/xml/).')
+    parser.add_argument('--dblp-index', type=str, default=DBLP_INDEX_PATH, help='Path to the DBLP index. (Default: {})'.format(DBLP_INDEX_PATH))
+    args = parser.parse_args()
+
+    index = DBLPIndex(args.dblp_index, create=True)
+    print("Indexing {}...".format(args.dump))
+    print("Indexed {:d} papers.".format(index.build(args.dump)))
+    index.close()
+
+if __name__ == '__main__':
+    main()
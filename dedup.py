@@ -0,0 +1,79 @@
+import re
+
+from contents import normalize_title
+from offline_index import extract_doi
+from papers import check_aligned
+
+# Titles of proceedings entries that are not papers (e.g., Springer "Front Matter"), once normalized.
+FRONT_MATTER = re.compile(r"^(front matter|back matter|preface|foreword|table of contents|contents|title pages?|copyright|"
+                          r"author index|subject index|index|erratum|errata|"
+                          r"(organizing |program |steering )?committees?|(message|welcome|letter) from .*|keynote.*|invited talks?)$")
+
+def clean(s):
+    '''Collapse the whitespace of a field, e.g. line breaks left by the proceedings markup.'''
+    return ' '.join(s.split())
+
+def author_set(authors):
+    '''Normalized names of the authors in an authors string ("A, B and C").'''
+    return frozenset(normalize_title(i) for i in re.split(r",| and ", authors) if normalize_title(i))
+
+def link_key(link):
+    '''The DOI of a link if it has one, otherwise the link without its scheme and trailing slash.'''
+    doi = extract_doi(link)
+    if doi is not None:
+        return 'doi:' + doi
+
+    return re.sub(r"^https?://", "", link.strip()).rstrip('/').lower() or None
+
+class Deduplicator(object):
+    '''
+    Filter for the chunks of (authors, titles, links) listed for a conference-year, before any paper is queried.
+
+    The fields are cleaned of stray whitespace, and entries are dropped if they have no title, are front matter,
+    or duplicate a paper listed before: the same link (or DOI), or the same normalized title and set of authors
+    (e.g., a paper shown on two CVF day pages). Every entry dropped is a Google Scholar query saved.
+    '''
+
+    def __init__(self):
+        self.links = set()
+        self.papers = set() # (Normalized title, author set)
+        self.n_listed = 0
+        self.n_duplicates = 0
+        self.n_front_matter = 0
+
+    @property
+    def n_dropped(self):
+        return self.n_duplicates + self.n_front_matter
+
+    def filter(self, authors, titles, links):
+        '''
+        Return the (authors, titles, links) of a chunk left after cleaning and dropping entries.
+        Raises ValueError if the lists of the chunk are not aligned.
+        '''
+        check_aligned(authors, titles, links)
+
+        authors_, titles_, links_ = [], [], []
+        for author, title, link in zip(authors, titles, links):
+            self.n_listed += 1
+            author, title, link = clean(author), clean(title), link.strip()
+
+            title_key = normalize_title(title)
+            if not title_key or FRONT_MATTER.match(title_key):
+                self.n_front_matter += 1
+                continue
+
+            key = link_key(link)
+            paper = (title_key, author_set(author))
+            if key in self.links or paper in self.papers:
+                self.n_duplicates += 1
+                continue
+
+            if key is not None:
+                self.links.add(key)
+            self.papers.add(paper)
+
+            authors_.append(author)
+            titles_.append(title)
+            links_.append(link)
+
+        return authors_, titles_, links_
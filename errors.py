@@ -32,6 +32,29 @@ class SearchError(Error):
     def __init__(self):
         self.message = "No search results."
 
+class LoadError(Error):
+    """Exception raised for a page not ready within the timeout, or not loaded at all (e.g., connection refused).
+
+    Attributes:
+        message -- explanation of the error.
+    """
+
+    def __init__(self, url, reason=None):
+        if reason is None:
+            self.message = "Timed out loading {}.".format(url)
+        else:
+            self.message = "Failed loading {} ({}).".format(url, reason)
+
+class BudgetError(Error):
+    """Exception raised for a query past the query budget of a run (see ScholarPool.run).
+
+    Attributes:
+        message -- explanation of the error.
+    """
+
+    def __init__(self):
+        self.message = "Query budget spent."
+
 class GScholarError(Error):
     """Exception raised for auto-query detection.
 
@@ -40,4 +63,14 @@ class GScholarError(Error):
     """
 
     def __init__(self):
-        self.message = "No more alternative addresses. Restart this program."
\ No newline at end of file
+        self.message = "No more alternative addresses. Restart this program."
+
+class OfflineError(Error):
+    """Exception raised for a page not cached in offline mode.
+
+    Attributes:
+        message -- explanation of the error.
+    """
+
+    def __init__(self, url):
+        self.message = "No cached page for {} in offline mode.".format(url)
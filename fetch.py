@@ -0,0 +1,195 @@
+import os, time, json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from errors import *
+from metrics import metrics, import_module
+
+# Default Parameters
+PROCEEDINGS_CACHE_PATH = './temp/proceedings.sqlite'
+PROCEEDINGS_MAX_AGE = 7 # Days until a cached proceedings listing is revalidated.
+FETCH_WORKERS = 16 # Number of pages fetched at once.
+HOST_CONCURRENCY = 4 # Number of pages fetched at once from a single host.
+TIMEOUT = 30 # Seconds.
+
+class ProceedingsCache(object):
+    '''
+    Local cache of proceedings pages and parsed listings backed by SQLite.
+
+    "pages" keeps the raw body of every fetched page with its HTTP validators (ETag/Last-Modified).
+    "listings" keeps the parsed (authors, titles, links) of each conference-year with the pages used to parse it.
+    '''
+
+    def __init__(self, path=PROCEEDINGS_CACHE_PATH):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pages ("
+                          "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, fetched_at REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS listings ("
+                          "conference TEXT, year INTEGER, authors TEXT, titles TEXT, links TEXT, urls TEXT, fetched_at REAL, "
+                          "PRIMARY KEY (conference, year))")
+        self.conn.commit()
+
+    def get_page(self, url):
+        '''Return (etag, last_modified, body) of a cached page, otherwise None.'''
+        with self.lock:
+            return self.conn.execute("SELECT etag, last_modified, body FROM pages WHERE url = ?", (url,)).fetchone()
+
+    def put_page(self, url, etag, last_modified, body):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                              (url, etag, last_modified, body, time.time()))
+            self.conn.commit()
+
+    def get_listing(self, conference, year):
+        '''Return (authors, titles, links, urls, fetched_at) of a cached listing, otherwise None.'''
+        with self.lock:
+            row = self.conn.execute("SELECT authors, titles, links, urls, fetched_at FROM listings WHERE conference = ? AND year = ?",
+                                    (conference, year)).fetchone()
+        if row is None:
+            return None
+
+        return json.loads(row[0]), json.loads(row[1]), json.loads(row[2]), json.loads(row[3]), row[4]
+
+    def put_listing(self, conference, year, authors, titles, links, urls):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO listings (conference, year, authors, titles, links, urls, fetched_at) "
+                              "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (conference, year, json.dumps(authors), json.dumps(titles), json.dumps(links), json.dumps(urls), time.time()))
+            self.conn.commit()
+
+    def touch_listing(self, conference, year):
+        '''Mark a cached listing as revalidated now.'''
+        with self.lock:
+            self.conn.execute("UPDATE listings SET fetched_at = ? WHERE conference = ? AND year = ?", (time.time(), conference, year))
+            self.conn.commit()
+
+class Fetcher(object):
+    '''
+    HTTP fetcher for the proceedings parsers.
+
+    Every request goes through one pooled session with a timeout.
+    "get_many" fetches pages on a bounded thread pool, at most "host_concurrency" at once per host,
+    and returns them in the order requested. "iter_many" yields them in that order as soon as each is ready.
+
+    Pages are requested with conditional GETs against the validators kept in the cache,
+    and the cached body is reused when the server answers "304 Not Modified".
+    The URL of every page fetched is recorded in "visited" so that a parsed listing can be revalidated later.
+    In offline mode, only cached pages are served.
+    '''
+
+    def __init__(self, cache=None, offline=False, workers=FETCH_WORKERS, host_concurrency=HOST_CONCURRENCY, timeout=TIMEOUT):
+        self._session = None # Set up on the first request (see "session"), so that offline runs never import requests.
+
+        self.cache = cache
+        self.offline = offline
+        self.workers = workers
+        self.host_concurrency = host_concurrency
+        self.timeout = timeout
+        self.visited = []
+
+        self._lock = threading.Lock()
+        self._host_semaphores = {}
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                requests = import_module('requests')
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+                self._session = requests.Session()
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+
+            return self._session
+
+    def get(self, url):
+        '''Return the body of a page.'''
+        with self._lock:
+            if url not in self.visited:
+                self.visited.append(url)
+        body, _ = self._get(url)
+
+        return body
+
+    def get_many(self, urls):
+        '''Return the bodies of pages in the order of "urls", fetching them concurrently.'''
+        return list(self.iter_many(urls))
+
+    def iter_many(self, urls):
+        '''Yield the bodies of pages in the order of "urls", fetching them concurrently.'''
+        urls = list(urls)
+        if len(urls) <= 1:
+            for url in urls:
+                yield self.get(url)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(urls))) as executor:
+            for body in executor.map(self.get, urls):
+                yield body
+
+    def get_json(self, url):
+        return json.loads(self.get(url))
+
+    def is_modified(self, url):
+        '''Revalidate a cached page with a conditional GET.'''
+        _, modified = self._get(url)
+
+        return modified
+
+    def any_modified(self, urls):
+        '''Revalidate cached pages concurrently.'''
+        return any(self._map(self.is_modified, urls))
+
+    def _map(self, func, items):
+        items = list(items)
+        if len(items) <= 1:
+            return [func(i) for i in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    @metrics.timed('fetch')
+    def _get(self, url):
+        '''Return the body of a page and whether it changed since it was cached.'''
+        cached = self.cache.get_page(url) if self.cache is not None else None
+        if self.offline:
+            if cached is None:
+                raise OfflineError(url)
+            metrics.count('page_cache_hits')
+            return cached[2], False
+
+        headers = {}
+        if cached is not None:
+            if cached[0]:
+                headers['If-None-Match'] = cached[0]
+            if cached[1]:
+                headers['If-Modified-Since'] = cached[1]
+
+        with self._host_semaphore(url):
+            page = self.session.get(url, headers=headers, timeout=self.timeout)
+        if page.status_code == 304 and cached is not None:
+            metrics.count('page_cache_hits')
+            return cached[2], False
+
+        metrics.count('page_downloads')
+        page.raise_for_status()
+        if self.cache is not None:
+            self.cache.put_page(url, page.headers.get('ETag'), page.headers.get('Last-Modified'), page.content)
+
+        return page.content, True
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.host_concurrency)
+
+            return self._host_semaphores[host]
@@ -0,0 +1,171 @@
+import os, json
+import threading
+
+from papers import PaperTable
+
+# Default Parameters
+JOURNAL_DIR = './temp'
+SYNC_EVERY = 20 # Number of records between fsync calls.
+
+class Journal(object):
+    '''
+    Append-only checkpoint journal for a conference-year.
+
+    The journal is a JSONL file at "{JOURNAL_DIR}/{conference}{year}.jsonl".
+    The first record holds the list of papers, and each following record holds one resolved paper.
+    A listing still in progress is started empty ("complete" False), extended with "papers" records as they are listed,
+    and closed with a "complete" record.
+    Papers resolved before a listing was interrupted are carried over to the next one, which lists them again (see replay).
+    Every record is flushed as soon as it is written, so killing the program loses at most the paper in flight.
+    Records are fsync'ed in batches of "sync_every" to bound the cost of each checkpoint.
+    '''
+
+    def __init__(self, conference, year, dirname=JOURNAL_DIR, sync_every=SYNC_EVERY):
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.conference = conference
+        self.year = year
+        self.path = os.path.join(dirname, '{}{}.jsonl'.format(conference, year))
+        self.sync_every = sync_every
+        self._f = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self.carried = {} # (Link, title) -> (citations, etc) of the papers resolved by an incomplete journal replayed.
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def start(self, papers, complete=True):
+        '''
+        Start a new journal with the papers listed so far (a PaperTable), discarding any previous one.
+        A listing in progress keeps the papers carried over in its header, until they are listed again.
+        '''
+        self.close()
+
+        header = {'conference': self.conference,
+                  'year': self.year,
+                  'authors': papers.authors,
+                  'titles': papers.titles,
+                  'links': papers.links,
+                  'complete': complete}
+        if not complete and self.carried:
+            header['carried'] = [[link, title, citations, etc] for (link, title), (citations, etc) in self.carried.items()]
+
+        # Write the header to a temporary file and atomically replace the journal with it.
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._open()
+
+    def append(self, idx, citations, etc):
+        '''Record a resolved paper.'''
+        self._write({'idx': idx, 'citations': citations, 'etc': etc})
+
+    def add_papers(self, authors, titles, links):
+        '''Record papers listed after the start.'''
+        self._write({'papers': {'authors': authors, 'titles': titles, 'links': links}})
+
+    def carry(self, papers, indices):
+        '''Resolve the papers at "indices" carried over from an incomplete journal, and record them.'''
+        for idx in indices:
+            result = self.carried.get((papers.links[idx], papers.titles[idx]))
+            if result is not None:
+                papers.resolve(idx, *result)
+                self.append(idx, *result)
+
+    def complete(self):
+        '''Record the end of the listing.'''
+        self._write({'complete': True})
+        self.sync()
+
+    def replay(self):
+        '''
+        Read the journal back.
+        Returns a PaperTable with the citations and etc of the papers resolved so far,
+        or None if there is no valid journal or its listing was not completed.
+        In the latter case, the papers resolved so far are kept in "carried" by link and title, to be resolved again
+        as the listing is done again (see carry).
+        '''
+        if not self.exists():
+            return None
+
+        done = {}
+        with open(self.path, 'rb') as f:
+            try:
+                header = json.loads(f.readline().decode('utf-8'))
+            except ValueError:
+                return None
+
+            valid_size = f.tell()
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError()
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # A record truncated by a crash. Nothing valid can follow it.
+                    break
+
+                if 'papers' in record:
+                    for key in ['authors', 'titles', 'links']:
+                        header[key] += record['papers'][key]
+                elif 'complete' in record:
+                    header['complete'] = True
+                else:
+                    done[record['idx']] = (record['citations'], record['etc'])
+                valid_size += len(line)
+
+        if valid_size < os.path.getsize(self.path):
+            # Drop the truncated tail so that new records are not appended to it.
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+        if not header.get('complete', True):
+            # The papers left were never listed. List them again, without losing the papers resolved.
+            self.carried = {(link, title): (citations, etc) for link, title, citations, etc in header.get('carried', [])}
+            for idx, result in done.items():
+                self.carried[(header['links'][idx], header['titles'][idx])] = result
+            return None
+
+        papers = PaperTable(header['authors'], header['titles'], header['links'])
+        for idx, (citations, etc) in done.items():
+            papers.resolve(idx, citations, etc)
+
+        return papers
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._sync()
+                self._f.close()
+                self._f = None
+
+    def _write(self, record):
+        with self._lock:
+            if self._f is None:
+                self._open()
+
+            self._f.write(json.dumps(record) + '\n')
+            self._f.flush()
+
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+
+    def _sync(self):
+        if self._f is not None and self._unsynced > 0:
+            os.fsync(self._f.fileno())
+            self._unsynced = 0
+
+    def _open(self):
+        self._f = open(self.path, 'a', encoding='utf-8')
+        self._unsynced = 0
@@ -0,0 +1,72 @@
+from difflib import SequenceMatcher
+
+from contents import normalize_title, parse_gscholar_result
+
+# Default Parameters
+TITLE_WEIGHT = 0.8 # Weight of the title similarity in the match score. The rest goes to the author overlap.
+MATCH_THRESHOLD = 0.6 # Minimum match score to accept a search result.
+
+def title_similarity(a, b):
+    '''Similarity in [0, 1] of two titles, by the fuzzy ratio and the token overlap of their normalized forms.'''
+    a = normalize_title(a)
+    b = normalize_title(b)
+    if not a or not b:
+        return 0.
+
+    ratio = SequenceMatcher(None, a, b).ratio()
+
+    tokens_a = set(a.split())
+    tokens_b = set(b.split())
+    jaccard = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+    return max(ratio, jaccard)
+
+def last_names(authors):
+    '''
+    Normalized last names in an authors string, either "First Last, First Last and First Last"
+    or BibTeX "Last, First and Last, First" (e.g., the bibref of the CVF pages).
+    '''
+    names = authors.split(' and ')
+    if len(names) > 1 and all(name.count(',') == 1 for name in names):
+        # BibTeX: the last name comes before the comma.
+        names = [name.split(',')[0] for name in names]
+    else:
+        names = [i for name in names for i in name.split(',')]
+
+    return [normalize_title(i).split()[-1] for i in names if normalize_title(i)]
+
+def author_overlap(authors, snippet):
+    '''
+    Fraction in [0, 1] of the expected authors whose last name appears in the authors snippet of a search result.
+    Google Scholar truncates the snippet after a few authors, so only as many authors as the snippet lists are expected.
+    '''
+    last_names_ = last_names(authors)
+    snippet_tokens = set(normalize_title(snippet).split())
+    if not last_names_ or not snippet_tokens:
+        return 0.
+
+    n_listed = max(1, len(snippet.split(',')))
+    expected = last_names_[:n_listed]
+
+    return sum(name in snippet_tokens for name in expected) / len(expected)
+
+def match_results(divs, title, authors, threshold=MATCH_THRESHOLD):
+    '''
+    Match Google Scholar search results against the expected title and authors of a paper.
+    Returns the citations count of the best result and its match score,
+    or None and the best score if no result reaches "threshold".
+    '''
+    best_citations = None
+    best_score = 0.
+    for div in divs:
+        result_title, result_authors, citations = parse_gscholar_result(div)
+
+        score = TITLE_WEIGHT * title_similarity(title, result_title) + (1 - TITLE_WEIGHT) * author_overlap(authors, result_authors)
+        if score > best_score:
+            best_citations = citations
+            best_score = score
+
+    if best_score < threshold:
+        return None, best_score
+
+    return best_citations, best_score
@@ -0,0 +1,168 @@
+import os, sys, json, time
+import threading
+import functools
+import importlib
+from contextlib import contextmanager
+
+# Default Parameters
+REPORT_PATH = './temp/run_report.json'
+PREFIX = 'sortmyconf' # Prefix of the Prometheus metric names.
+
+class Metrics(object):
+    '''
+    Timing spans and counters of a run, shared by every thread.
+
+    A span times a stage (e.g., "load", "parse") and a counter counts events (e.g., "captchas"), both with optional labels
+    (e.g., mirror="scholar.google.com"). They are exported as a JSON run report or a Prometheus textfile.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.time()
+        self.spans = {} # (stage, labels) -> [count, seconds, max seconds]
+        self.counters = {} # (name, labels) -> count
+
+    @contextmanager
+    def span(self, stage, **labels):
+        '''Time the block as a stage.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, stage):
+        '''Decorator timing every call of a function as a stage.'''
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, stage, seconds, **labels):
+        '''Record a stage that took "seconds".'''
+        key = (stage, tuple(sorted(labels.items())))
+        with self.lock:
+            span = self.spans.setdefault(key, [0, 0., 0.])
+            span[0] += 1
+            span[1] += seconds
+            span[2] = max(span[2], seconds)
+
+    def count(self, name, n=1, **labels):
+        '''Count "n" events.'''
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def report(self):
+        '''Return the run report: every span and counter, and the counters per hour over every label.'''
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            spans = [{'stage': stage, 'labels': dict(labels), 'count': span[0], 'seconds': span[1], 'max': span[2]}
+                     for (stage, labels), span in sorted(self.spans.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+
+        totals = {}
+        for counter in counters:
+            totals[counter['name']] = totals.get(counter['name'], 0) + counter['value']
+
+        return {'started_at': self.started_at,
+                'elapsed': elapsed,
+                'spans': spans,
+                'counters': counters,
+                'per_hour': {name: value / elapsed * 3600 for name, value in totals.items()} if elapsed > 0 else {}}
+
+    def save_json(self, path=REPORT_PATH):
+        write_atomic(path, json.dumps(self.report(), indent=2))
+
+    def save_prometheus(self, path):
+        '''Write the spans and counters in the Prometheus text format, e.g. for the textfile collector of node_exporter.'''
+        report = self.report()
+
+        lines = ['# TYPE {}_stage_seconds summary'.format(PREFIX)]
+        for span in report['spans']:
+            labels = format_labels(dict(span['labels'], stage=span['stage']))
+            lines.append('{}_stage_seconds_sum{} {}'.format(PREFIX, labels, span['seconds']))
+            lines.append('{}_stage_seconds_count{} {}'.format(PREFIX, labels, span['count']))
+
+        names = []
+        for counter in report['counters']:
+            if counter['name'] not in names:
+                names.append(counter['name'])
+                lines.append('# TYPE {}_{}_total counter'.format(PREFIX, counter['name']))
+            lines.append('{}_{}_total{} {}'.format(PREFIX, counter['name'], format_labels(counter['labels']), counter['value']))
+
+        lines.append('# TYPE {}_run_seconds gauge'.format(PREFIX))
+        lines.append('{}_run_seconds {}'.format(PREFIX, report['elapsed']))
+
+        write_atomic(path, '\n'.join(lines) + '\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in sorted(labels.items())) + '}'
+
+def write_atomic(path, text):
+    '''Write a file so that readers never see it half written.'''
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def profile(profiler, path):
+    '''Profile the block with "cprofile" or "pyinstrument" (if installed), saving the profile to "path".'''
+    if profiler == 'cprofile':
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(path)
+            print("Saved the profile to {}. Read it with \"python -m pstats {}\".".format(path, path))
+
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("Please install pyinstrument.")
+            raise
+
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            write_atomic(path, prof.output_html())
+            print("Saved the profile to {}.".format(path))
+
+    else:
+        yield
+
+metrics = Metrics() # Metrics of this process.
+
+def import_module(name):
+    '''
+    Import a heavy module (e.g., pandas) on first use, so that runs not needing it never pay for it.
+    The import is timed as the "import" stage of the module.
+    '''
+    module = sys.modules.get(name)
+    if module is None:
+        with metrics.span('import', module=name):
+            module = importlib.import_module(name)
+
+    return module
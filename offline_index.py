@@ -0,0 +1,145 @@
+import os, re, json, gzip, argparse
+import sqlite3
+
+from contents import normalize_title
+
+# Default Parameters
+INDEX_PATH = './temp/offline_index.sqlite'
+BATCH_SIZE = 10000 # Number of works inserted at once while ingesting a dump.
+
+DOI_PATTERN = re.compile(r"(10\.\d{4,9}/[^\s?#]+)")
+
+def extract_doi(s):
+    '''Extract a lowercase DOI from a link or a DOI string, otherwise None.'''
+    if not s:
+        return None
+
+    res = DOI_PATTERN.search(s)
+    if res is None:
+        return None
+
+    return res.group(1).lower().rstrip('.')
+
+def parse_work(work):
+    '''
+    Parse the DOI, the title and the citations count of a work in a bulk dump.
+    Both OpenAlex-style ("doi", "title"/"display_name", "cited_by_count")
+    and Semantic Scholar-style ("externalids": {"DOI"}, "title", "citationcount") records are supported.
+    '''
+    doi = work.get('doi')
+    if doi is None:
+        external_ids = work.get('externalids') or work.get('externalIds') or {}
+        doi = external_ids.get('DOI')
+
+    title = work.get('title') or work.get('display_name') or ''
+
+    citations = work.get('cited_by_count')
+    if citations is None:
+        citations = work.get('citationcount', work.get('citationCount'))
+
+    return extract_doi(doi), normalize_title(title), citations
+
+class OfflineIndex(object):
+    '''
+    Compact on-disk citation index built from bulk works dumps, backed by SQLite.
+
+    "dois" maps a DOI to a citations count, and "titles" maps a normalized title to a citations count.
+    If several works share a key, the highest count is kept.
+    The index is only created with "create" (to ingest dumps). Otherwise, ValueError is raised if it is missing or empty,
+    rather than resolving every paper to 0 citations.
+    '''
+
+    def __init__(self, path=INDEX_PATH, create=False):
+        self.path = path
+        if not create:
+            if not os.path.isfile(path):
+                raise ValueError("No offline index at {}. Build it with offline_index.py first.".format(path))
+
+            self.conn = sqlite3.connect(path)
+            try:
+                n_rows = self.conn.execute("SELECT EXISTS (SELECT 1 FROM dois) OR EXISTS (SELECT 1 FROM titles)").fetchone()[0]
+            except sqlite3.DatabaseError:
+                n_rows = 0
+            if not n_rows:
+                self.conn.close()
+                raise ValueError("The offline index at {} is empty or invalid. Build it with offline_index.py first.".format(path))
+            return
+
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dois (doi TEXT PRIMARY KEY, citations INTEGER) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS titles (title TEXT PRIMARY KEY, citations INTEGER) WITHOUT ROWID")
+        self.conn.commit()
+
+    def ingest(self, dump_path, batch_size=BATCH_SIZE):
+        '''Stream a (gzipped) JSONL works dump into the index. Returns the number of works indexed.'''
+        opener = gzip.open if dump_path.endswith('.gz') else open
+
+        n_works = 0
+        dois = []
+        titles = []
+        with opener(dump_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                doi, title, citations = parse_work(json.loads(line))
+                if citations is None:
+                    continue
+
+                if doi:
+                    dois.append((doi, citations))
+                if title:
+                    titles.append((title, citations))
+                n_works += 1
+
+                if len(dois) + len(titles) >= batch_size:
+                    self._insert(dois, titles)
+                    dois = []
+                    titles = []
+
+        self._insert(dois, titles)
+
+        return n_works
+
+    def lookup(self, link, title):
+        '''Return the citations count of a paper by the DOI in its link, then by its normalized title, otherwise None.'''
+        doi = extract_doi(link)
+        if doi is not None:
+            row = self.conn.execute("SELECT citations FROM dois WHERE doi = ?", (doi,)).fetchone()
+            if row is not None:
+                return row[0]
+
+        row = self.conn.execute("SELECT citations FROM titles WHERE title = ?", (normalize_title(title),)).fetchone()
+        if row is not None:
+            return row[0]
+
+        return None
+
+    def close(self):
+        self.conn.close()
+
+    def _insert(self, dois, titles):
+        self.conn.executemany("INSERT INTO dois (doi, citations) VALUES (?, ?) "
+                              "ON CONFLICT (doi) DO UPDATE SET citations = max(citations, excluded.citations)", dois)
+        self.conn.executemany("INSERT INTO titles (title, citations) VALUES (?, ?) "
+                              "ON CONFLICT (title) DO UPDATE SET citations = max(citations, excluded.citations)", titles)
+        self.conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build an offline citation index from bulk works dumps.')
+    parser.add_argument('dumps', type=str, nargs='+', help='Paths to (gzipped) JSONL works dumps, e.g. OpenAlex or Semantic Scholar snapshots.')
+    parser.add_argument('--index-path', type=str, default=INDEX_PATH, help='Path to the offline index. (Default: {})'.format(INDEX_PATH))
+    args = parser.parse_args()
+
+    index = OfflineIndex(args.index_path, create=True)
+    for dump_path in args.dumps:
+        print("Ingesting {}...".format(dump_path))
+        print("Indexed {:d} works.".format(index.ingest(dump_path)))
+    index.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+from metrics import import_module
+
+COLUMNS = ['authors', 'titles', 'links', 'citations', 'etc']
+
+class Paper(object):
+    '''A row of a PaperTable.'''
+    __slots__ = ['idx', 'author', 'title', 'link', 'citations', 'etc']
+
+    def __init__(self, idx, author, title, link, citations, etc):
+        self.idx = idx
+        self.author = author
+        self.title = title
+        self.link = link
+        self.citations = citations
+        self.etc = etc
+
+    def __repr__(self):
+        return "Paper({!r}, {!r}, {!r}, {!r}, {!r}, {!r})".format(self.idx, self.author, self.title, self.link, self.citations, self.etc)
+
+class PaperTable(object):
+    '''
+    Papers of a conference-year, stored by column.
+
+    The columns "authors", "titles", "links" are filled as papers are listed, and "citations", "etc" (None until resolved)
+    as they are resolved, always at the same index: every change goes through "extend" and "resolve", which keep them aligned.
+    The columns are plain lists, handed to pandas as they are ("to_dataframe") and to the journal chunk by chunk.
+    '''
+    __slots__ = COLUMNS
+
+    def __init__(self, authors=None, titles=None, links=None, citations=None, etc=None):
+        self.authors = list(authors) if authors is not None else []
+        self.titles = list(titles) if titles is not None else []
+        self.links = list(links) if links is not None else []
+        self.citations = list(citations) if citations is not None else [None for _ in self.authors]
+        self.etc = list(etc) if etc is not None else [None for _ in self.authors]
+        check_aligned(self.authors, self.titles, self.links, self.citations, self.etc)
+
+    def __len__(self):
+        return len(self.authors)
+
+    def __getitem__(self, idx):
+        return Paper(idx, self.authors[idx], self.titles[idx], self.links[idx], self.citations[idx], self.etc[idx])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def extend(self, authors, titles, links):
+        '''Add listed papers. Returns the range of their indices.'''
+        check_aligned(authors, titles, links)
+
+        start = len(self.authors)
+        self.authors.extend(authors)
+        self.titles.extend(titles)
+        self.links.extend(links)
+        self.citations.extend(None for _ in authors)
+        self.etc.extend(None for _ in authors)
+
+        return range(start, len(self.authors))
+
+    def resolve(self, idx, citations, etc):
+        '''Record the citations and the "Etc" log of a paper.'''
+        self.citations[idx] = citations
+        self.etc[idx] = etc
+
+    def is_resolved(self, idx):
+        return self.citations[idx] is not None
+
+    def n_resolved(self):
+        return sum(c is not None for c in self.citations)
+
+    def to_dataframe(self):
+        '''Return the papers as a DataFrame with the columns of the csv output, indexed by paper ID from 1.'''
+        pd = import_module('pandas')
+
+        data = pd.DataFrame({'Author': self.authors, 'Title': self.titles, 'Citations': self.citations,
+                             'Source': self.links, 'Etc': self.etc}, copy=False)
+        data.index = pd.RangeIndex(1, len(self) + 1, name='ID')
+
+        return data
+
+def check_aligned(*columns):
+    '''Raise ValueError unless every column has the same length.'''
+    lengths = set(len(column) for column in columns)
+    if len(lengths) > 1:
+        raise ValueError("Misaligned paper columns of lengths {}.".format([len(column) for column in columns]))
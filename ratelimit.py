@@ -0,0 +1,69 @@
+import time
+import threading
+
+# Default Parameters
+RATE = 2.0 # Initial queries per second.
+MIN_RATE = 0.05
+MAX_RATE = 5.0
+INCREASE = 0.1 # Queries per second added after a run of clean responses.
+DECREASE = 0.5 # Factor applied to the rate on a captcha or an automated queries check.
+CLEAN_RUN = 10 # Number of clean responses before the rate increases.
+
+class AdaptiveRateLimiter(object):
+    '''
+    Token bucket whose rate adapts to Google Scholar responses (AIMD).
+
+    The rate increases additively by "increase" after every "clean_run" clean responses,
+    and decreases multiplicatively by "decrease" on RobotError or AQError.
+    Every change of rate is recorded in "history" as (timestamp, rate, reason).
+    '''
+
+    def __init__(self, rate=RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, increase=INCREASE, decrease=DECREASE,
+                 clean_run=CLEAN_RUN, burst=1):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.clean_run = clean_run
+        self.burst = burst
+
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated_at = time.time()
+        self.streak = 0
+        self.history = [(self.updated_at, rate, 'start')]
+
+    def acquire(self):
+        '''Block until a query is allowed.'''
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            # Take a token, possibly in advance. The caller waits until it has been refilled.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def success(self):
+        '''Report a clean response.'''
+        with self.lock:
+            self.streak += 1
+            if self.streak >= self.clean_run:
+                self.streak = 0
+                self._set_rate(self.rate + self.increase, 'increase')
+
+    def failure(self, reason):
+        '''Report a captcha or an automated queries check.'''
+        with self.lock:
+            self.streak = 0
+            self._set_rate(self.rate * self.decrease, reason)
+
+    def _set_rate(self, rate, reason):
+        rate = max(self.min_rate, min(self.max_rate, rate))
+        if rate != self.rate:
+            self.rate = rate
+            self.history.append((time.time(), rate, reason))
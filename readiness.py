@@ -0,0 +1,63 @@
+import enum
+
+from contents import ERROR_KW, ROBOT_KW, EMPTY_KW
+
+# Default Parameters
+READY_TIMEOUT = 15 # Seconds until a Google Scholar page is given up.
+POLL_INTERVAL = 0.05 # Seconds between checks of the page.
+
+# Visible text of the page and of its first contents row, read in a single round trip to the browser.
+READY_SCRIPT = '''
+if (document.body === null) return null;
+var rows = document.querySelectorAll('div.gs_r');
+return [document.body.innerText, rows.length > 0 ? rows[0].innerText : null];
+'''
+
+class PageState(enum.Enum):
+    '''Outcome of loading a Google Scholar page.'''
+    RESULTS = 'results'
+    EMPTY = 'empty'
+    CAPTCHA = 'captcha'
+    AUTOMATED_QUERIES = 'automated queries'
+    TIMEOUT = 'timeout'
+
+def classify_gscholar_page(text, first_row):
+    '''
+    Classify a Google Scholar page by its visible text and the text of its first contents row (None if no row yet).
+    Returns None if the page shows none of the outcomes yet.
+    '''
+    if any(kw in text for kw in ROBOT_KW):
+        return PageState.CAPTCHA
+
+    if any(kw in text for kw in ERROR_KW):
+        return PageState.AUTOMATED_QUERIES
+
+    if first_row is not None:
+        if any(kw in first_row for kw in EMPTY_KW):
+            return PageState.EMPTY
+        return PageState.RESULTS
+
+    if any(kw in text for kw in EMPTY_KW):
+        return PageState.EMPTY
+
+    return None
+
+def wait_for_gscholar(driver, timeout=READY_TIMEOUT, poll=POLL_INTERVAL):
+    '''
+    Wait until the page loaded in a Chrome window shows search results, empty results, a captcha or the automated queries banner.
+    Returns the PageState as soon as one shows up, or PageState.TIMEOUT after "timeout" seconds.
+    '''
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+    def ready(driver):
+        page = driver.execute_script(READY_SCRIPT)
+        if page is None:
+            return None
+        return classify_gscholar_page(*page)
+
+    try:
+        # Script errors while the page is being replaced are retried at the next poll.
+        return WebDriverWait(driver, timeout, poll, ignored_exceptions=[WebDriverException]).until(ready)
+    except TimeoutException:
+        return PageState.TIMEOUT
@@ -0,0 +1,64 @@
+import math
+import time
+import datetime
+
+# Default Parameters
+MIN_AGE = 30 # Days a paper is assumed to be out at least, for the growth rate of papers fetched only once.
+
+class RefreshPlan(object):
+    '''
+    Papers of a conference-year to query again in a refresh, and the cached counts of the rest.
+
+    "queries" lists the indices of the papers to query in priority order, and "stale" maps the index of every paper
+    to its cached (citations, etc), or to 0 citations if it was never fetched, for the papers left when the budget runs out.
+    '''
+
+    def __init__(self, queries, stale, scores):
+        self.queries = queries
+        self.stale = stale
+        self.scores = scores # Index -> priority of every paper with a cache entry.
+
+def growth_rate(history, published_at):
+    '''
+    Citations per day of a paper, from its (fetched_at, citations) history.
+    With a single count, the rate is averaged since the paper was published.
+    '''
+    fetched_at, citations = history[-1]
+    if len(history) > 1 and fetched_at > history[0][0]:
+        return max(citations - history[0][1], 0) / ((fetched_at - history[0][0]) / 86400)
+
+    return citations / max((fetched_at - published_at) / 86400, MIN_AGE)
+
+def plan_refresh(papers, indices, cache, budget, year, month=None, now=None):
+    '''
+    Pick the papers at "indices" to query again within a "budget" of Google Scholar queries.
+
+    Papers never fetched come first. The rest are ordered by the citations they are expected to have gained since their last fetch
+    (growth rate times the days since the fetch), weighted by their current rank so that changes near the top count more:
+    priority = expected gain / log2(rank + 1).
+    '''
+    now = time.time() if now is None else now
+    published_at = time.mktime(datetime.date(year, month or 1, 1).timetuple())
+
+    missing = []
+    cached = {}
+    for idx in indices:
+        entry = cache.latest(papers.links[idx], papers.titles[idx])
+        if entry is None:
+            missing.append(idx)
+        else:
+            cached[idx] = entry
+
+    scores = {}
+    ranked = sorted(cached, key=lambda idx: cached[idx][0], reverse=True)
+    for rank, idx in enumerate(ranked, 1):
+        citations, etc, fetched_at = cached[idx]
+        history = cache.history(papers.links[idx], papers.titles[idx]) or [(fetched_at, citations)]
+        gain = growth_rate(history, published_at) * max(now - fetched_at, 0) / 86400
+        scores[idx] = gain / math.log2(rank + 1)
+
+    queries = (missing + sorted(ranked, key=lambda idx: scores[idx], reverse=True))[:max(budget, 0)]
+    stale = {idx: cached[idx][:2] for idx in ranked}
+    stale.update((idx, (0, "Not Queried (Refresh Budget)")) for idx in missing)
+
+    return RefreshPlan(queries, stale, scores)
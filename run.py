@@ -1,12 +1,25 @@
-import sys, os, datetime, argparse
-import pickle as pkl
-from time import sleep
+import sys, os, re, time, datetime, argparse, json
 
-import pandas as pd
-from tqdm import tqdm
+STARTED_AT = time.perf_counter()
 
+# pandas, tqdm, bs4, requests and the browser are loaded by the stages needing them (see metrics.import_module).
 from errors import *
-from contents import get_gscholar_contents, get_citations, get_papers_list
+from contents import iter_papers_list
+from scholar import ScholarPool, GSCHOLAR_URL
+from backends import SeleniumBackend, HTTPBackend
+from browser import setup_driver, blocked_urls, BLOCKLIST, BLOCK
+from ratelimit import RATE, MAX_RATE
+from offline_index import OfflineIndex, INDEX_PATH
+from dblp_xml import DBLPIndex, DBLP_INDEX_PATH
+from cache import CitationCache, CACHE_PATH, CACHE_TTL
+from journal import Journal
+from papers import PaperTable
+from refresh import plan_refresh
+from dedup import Deduplicator
+from snapshots import SnapshotStore, SNAPSHOTS_DIR
+from service import RankingService, ResultStore, OperatorConsole, SERVICE_PORT, RESULT_TTL
+from fetch import Fetcher, ProceedingsCache, PROCEEDINGS_MAX_AGE
+from metrics import metrics, profile, import_module, REPORT_PATH
 
 # Solve conflict between raw_input and input on Python 2 and Python 3
 if sys.version[0]=="3": raw_input=input
@@ -14,47 +27,142 @@ if sys.version[0]=="3": raw_input=input
 # Default Parameters
 CSVPATH = '.' # Current folder
 
-def get_command_line_args():
+CONFERENCE_DICT = {'cvpr': 'CVPR',
+                   'iccv': 'ICCV',
+                   'iclr': 'ICLR',
+                   'icml': 'ICML',
+                   'eccv': 'ECCV',
+                   'icra': 'ICRA',
+                   'nips': 'NeurIPS',
+                   'neurips': 'NeurIPS'}
+
+def check_job(conference, year, month, proceedings='web'):
+    '''Validate a (conference, year, month) job and return it with the conference name normalized.'''
     now = datetime.datetime.now()
 
+    if conference.lower() in CONFERENCE_DICT.keys():
+        conference = CONFERENCE_DICT[conference.lower()]
+
+    elif proceedings != 'dblp-xml':
+        # Any DBLP venue key (e.g., "aaai") is accepted with the DBLP index.
+        raise ValueError("Conference must be one of {}".format(list(CONFERENCE_DICT.keys())))
+
+    if month:
+        if month < 1 or month > 12:
+            raise ValueError("Month must be in range [1, ..., 12].")
+            
+        if year == now.year and month > now.month:
+            raise ValueError("Month must be <= {}.".format(now.month))
+
+    else:
+        month = None
+
+    return conference, year, month
+
+def read_jobs(path, proceedings='web'):
+    '''
+    Read a job file listing one "conference year [month]" per line (separated by spaces or commas).
+    Empty lines and lines starting with "#" are ignored.
+    '''
+    jobs = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+
+            fields = re.split(r"[\s,]+", line)
+            if len(fields) not in [2, 3]:
+                raise ValueError("Invalid job \"{}\" in {}.".format(line, path))
+
+            month = int(fields[2]) if len(fields) == 3 else None
+            jobs.append(check_job(fields[0], int(fields[1]), month, proceedings))
+
+    return jobs
+
+def get_command_line_args():
     # Command line arguments
     parser = argparse.ArgumentParser(description='Arguments')
-    parser.add_argument('--conference', type=str, required=True, help='Conference name to sort papers.')
-    parser.add_argument('--year', type=int, required=True, help='Conference year to sort papers.')
+    parser.add_argument('--conference', type=str, help='Conference name to sort papers. (Required without --jobs)')
+    parser.add_argument('--year', type=int, help='Conference year to sort papers. (Required without --jobs)')
     parser.add_argument('--month', type=int, help='Conference month. (Optinal)')
+    parser.add_argument('--jobs', type=str, help='Path to a job file listing "conference year [month]" per line, to sort them in a batch sharing the browsers and caches.')
     parser.add_argument('--csvpath', type=str, help='Path to save the exported csv file. By default it is the current folder')
+    parser.add_argument('--cache-path', type=str, default=CACHE_PATH, help='Path to the citation cache. (Default: {})'.format(CACHE_PATH))
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL, help='Days until a cached citation count expires. (Default: {})'.format(CACHE_TTL))
+    parser.add_argument('--no-cache', action='store_true', help='Query every paper on Google Scholar, ignoring the citation cache.')
+    parser.add_argument('--refresh', type=int, metavar='BUDGET', help='Refresh a ranking with at most BUDGET Google Scholar queries: query again the papers expected to have changed most since their last fetch (by their citation history, rank and age of the fetch), and keep the cached counts of the rest.')
+    parser.add_argument('--proceedings-max-age', type=float, default=PROCEEDINGS_MAX_AGE, help='Days until a cached proceedings listing is revalidated. (Default: {})'.format(PROCEEDINGS_MAX_AGE))
+    parser.add_argument('--workers', type=int, default=1, help='Number of Chrome windows querying Google Scholar in parallel. (Default: 1)')
+    parser.add_argument('--source', type=str, default='scholar', choices=['scholar', 'offline-index'], help='Where to find the citations. "offline-index" resolves every paper from the offline index built by offline_index.py, without any web query. (Default: scholar)')
+    parser.add_argument('--index-path', type=str, default=INDEX_PATH, help='Path to the offline index. (Default: {})'.format(INDEX_PATH))
+    parser.add_argument('--backend', type=str, default='selenium', choices=['selenium', 'http'], help='How to query Google Scholar. "http" sends plain HTTP requests and opens Chrome only to solve captchas. (Default: selenium)')
+    parser.add_argument('--scholar-url', type=str, default=GSCHOLAR_URL, help='Google Scholar search URL with {mirror} and {query} fields, e.g. to query a local stand-in server.')
+    parser.add_argument('--lookup', type=str, default='link', choices=['link', 'match'], help='How to find a paper on Google Scholar. "link" searches the proceedings link, then the title. "match" searches the title once and matches the results against the title and authors. (Default: link)')
+    parser.add_argument('--rate', type=float, default=RATE, help='Initial Google Scholar queries per second for each mirror. (Default: {})'.format(RATE))
+    parser.add_argument('--max-rate', type=float, default=MAX_RATE, help='Maximum Google Scholar queries per second for each mirror. (Default: {})'.format(MAX_RATE))
+    parser.add_argument('--proceedings', type=str, default='web', choices=['web', 'dblp-xml'], help='Where to list the papers. "dblp-xml" reads the DBLP index built by dblp_xml.py, without any network, and supports any DBLP conference. (Default: web)')
+    parser.add_argument('--dblp-index', type=str, default=DBLP_INDEX_PATH, help='Path to the DBLP index. (Default: {})'.format(DBLP_INDEX_PATH))
+    parser.add_argument('--offline', action='store_true', help='Load the proceedings listing from the local cache only.')
+    parser.add_argument('--lean', action='store_true', help='Low-bandwidth Chrome: block the assets in --block and return from page loads once the document is parsed.')
+    parser.add_argument('--block', type=str, default=','.join(BLOCK), help='Comma-separated assets to block with --lean, among {}. (Default: {})'.format(list(BLOCKLIST.keys()), ','.join(BLOCK)))
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window. Captchas cannot be solved then.')
+    parser.add_argument('--profile-dir', type=str, help='Directory to keep a Chrome profile per worker across runs, with the Google Scholar cookies earned by solving captchas.')
+    parser.add_argument('--report', type=str, default=REPORT_PATH, help='Path to save the JSON run report with the time spent in each stage and the counts of queries, captchas, cache hits and retries. (Default: {})'.format(REPORT_PATH))
+    parser.add_argument('--prometheus', type=str, help='Path to save the run metrics in the Prometheus text format, e.g. for the textfile collector of node_exporter.')
+    parser.add_argument('--profiler', type=str, choices=['cprofile', 'pyinstrument'], help='Profile the run and save the profile to ./temp/profile.prof (cprofile) or ./temp/profile.html (pyinstrument).')
+    parser.add_argument('--snapshots', type=str, nargs='?', const=SNAPSHOTS_DIR, metavar='DIR', help='Also keep each ranking as a dated snapshot in DIR (Default: {}), to query across conferences, years and runs with snapshots.py. Requires pyarrow.'.format(SNAPSHOTS_DIR))
+    parser.add_argument('--serve', type=int, nargs='?', const=SERVICE_PORT, metavar='PORT', help='Run as a ranking service on PORT (Default: {}) with an HTTP API to request rankings, sharing the workers, the caches and a single captcha console among its users (see service.py).'.format(SERVICE_PORT))
+    parser.add_argument('--result-ttl', type=float, default=RESULT_TTL, help='Days a ranking sorted by the service is served again without sorting the conference. (Default: {})'.format(RESULT_TTL))
+    parser.add_argument('--attach', type=str, help='Comma-separated remote debugging addresses (e.g., "127.0.0.1:9222") of running Chrome windows to use instead of starting new ones, one per worker.')
 
     # Parse and read arguments and assign them to variables if exists
     args, _ = parser.parse_known_args()
 
-    conference_dict = {'cvpr': 'CVPR',
-                       'iccv': 'ICCV',
-                       'iclr': 'ICLR',
-                       'icml': 'ICML',
-                       'eccv': 'ECCV',
-                       'icra': 'ICRA',
-                       'nips': 'NeurIPS',
-                       'neurips': 'NeurIPS'}
-    if args.conference.lower() not in conference_dict.keys():
-        raise ValueError("Conference must be one of {}".format(list(conference_dict.keys())))
-    conference = conference_dict[args.conference.lower()]
-
-    year = args.year
-    month = None
-    if args.month:
-        if args.month < 1 or args.month > 12:
-            raise ValueError("Month must be in range [1, ..., 12].")
-            
-        if year == now.year and args.month > now.month:
-            raise ValueError("Month must be <= {}.".format(now.month))
+    if args.jobs:
+        args.jobs = read_jobs(args.jobs, args.proceedings)
 
-        month = args.month
+    elif args.serve is not None:
+        args.jobs = []
 
-    csvpath = CSVPATH
-    if args.csvpath:
-        csvpath = args.csvpath
+    elif args.conference is None or args.year is None:
+        parser.error("--conference and --year are required without --jobs or --serve.")
 
-    return conference, year, month, csvpath
+    else:
+        args.jobs = [check_job(args.conference, args.year, args.month, args.proceedings)]
+
+    if args.rate <= 0 or args.max_rate < args.rate:
+        raise ValueError("Rate must be in range (0, max-rate].")
+
+    if args.workers < 1:
+        raise ValueError("Workers must be >= 1.")
+
+    if args.refresh is not None:
+        if args.refresh < 0:
+            raise ValueError("Refresh budget must be >= 0.")
+        if args.no_cache or args.source != 'scholar':
+            parser.error("--refresh needs the citation cache and --source scholar.")
+
+    if args.proceedings == 'dblp-xml':
+        DBLPIndex(args.dblp_index).close()
+
+    if args.source == 'offline-index':
+        # Fail before listing any paper, rather than resolving them all to 0 citations.
+        OfflineIndex(args.index_path).close()
+
+    if args.attach:
+        args.attach = [i.strip() for i in args.attach.split(',') if i.strip()]
+        if len(args.attach) < args.workers:
+            raise ValueError("--attach needs an address for each of the {:d} workers.".format(args.workers))
+
+    args.block = [i for i in args.block.split(',') if i]
+    if any(i not in BLOCKLIST for i in args.block):
+        raise ValueError("Blocked assets must be among {}.".format(list(BLOCKLIST.keys())))
+
+    if not args.csvpath:
+        args.csvpath = CSVPATH
+
+    return args
 
 def query_yes_no(question, default="yes"):
     """Ask a yes/no question via raw_input() and return their answer.
@@ -88,175 +196,168 @@ def query_yes_no(question, default="yes"):
             sys.stdout.write("Please respond with 'yes' or 'no' "
                              "(or 'y' or 'n').\n")
 
-def setup_driver():
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.chrome.options import Options
-        from selenium.common.exceptions import StaleElementReferenceException
-        import chromedriver_autoinstaller
-        chromedriver_autoinstaller.install()
-
-    except Exception as e:
-        print(e)
-        print("Please install selenium and chromedriver_autoinstaller.")
-
-    print('Loading...')
-    chrome_options = Options()
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument("window-size=1280,800")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.169 Safari/537.36")
-
-    driver = webdriver.Chrome(chrome_options=chrome_options)
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
-    return driver
-
-
-def save_checkpoint(conference, year, authors, titles, links, idx, citations, etc):
-    if idx != 0:
-        with open('./temp/backup.pkl', 'wb') as f:
-            pkl.dump({'conference': conference,
-                      'year': year,
-                      'authors': authors,
-                      'titles': titles,
-                      'links': links,
-                      'idx': idx,
-                      'citations': citations,
-                      'etc': etc}, f)
-
-def restore_checkpoint():
-    with open('./temp/backup.pkl', 'rb') as f:
-        data = pkl.load(f)
-    
-    return data['conference'], data['year'], data['authors'], data['titles'], data['links'], data['idx'], data['citations'], data['etc']
-
-def main():
-    GSCHOLAR_URL = "https://scholar.google.com/scholar?hl=en&as_sdt=0%2C5&q={}&num=1"
-    
-    # Variables
-    conference, year, month, csvpath = get_command_line_args()
-
-    if month is None:
-        print("Please provide month for \"cit/month\" information.")
-
-    # Accumul.
-    start_idx = 0
-    citations = []
-    etc = []
-
-    restored = False
-    if os.path.isfile('./temp/backup.pkl'):
-        conf_, year_, authors, titles, links, start_idx_, citations_, etc_ = restore_checkpoint()
-
-        if conference == conf_ and year == year_:
-            restored = query_yes_no("Restore from backup? {} {} {}/{} papers done.".format(conf_, year_, start_idx_, len(authors)))
-
-    if restored:
-        start_idx = start_idx_
-        citations = citations_
-        etc = etc_
-
-    else:
-        print("Loading {} {} results".format(conference, year))
-        authors, titles, links = get_papers_list(conference, year)
-        print("Found {:d} papers.".format(len(authors)))
-
-    driver = setup_driver() # Load chrome driver
-    for idx in tqdm(range(start_idx, len(authors)), total=len(authors), initial=start_idx):
-        title = titles[idx]
-        link = links[idx]
-
-        query = link.replace("https://doi.org/", "").replace(':', '%3A').replace('/', '%2F')
-        url = GSCHOLAR_URL.format(query)
-        driver.get(url)
-
-        while(len(citations) != idx+1):
-            """
-            While Loop 작동 매커니즘
-
-            구글 스콜라 검색 결과를 읽어와서 다음 예외 상황에 대처
-      
-            Case (1) 캡차 풀기 요구 받은 경우
-            유저가 직접 캡차를 풀고, 터미널에 엔터를 입력해주면 계속 진행.
-
-            Case (2) Auto Query 감지에 걸린 경우
-            이 경우는 구글 국가를 변경하는 방법 외에는 Bypass 불가능.
-            .com -> .co.kr -> .co.uk -> .ca 순으로 변경.
-            .ca 까지 모두 소진한 경우 프로그램 종료 (프로그램 다시 시작하면 됨).
-
-            Case (3) 검색 결과가 없음
-            논문 Repo 링크 대신 논문 제목으로 재검색.
-            재검색에도 결과 없으면 Citation 0개로 처리 및 "etc" 열에 에러 로그 추가.
-
-            Case (4) 알 수 없는 에러
-            Python debugger 실행.
-            """
-
-            try:
-                # Try getting gscholar search results.
-                gs_content = get_gscholar_contents(driver)
-                citations.append(get_citations(str(gs_content.format_string)))
-                etc.append("")
-
-            except RobotError:
-                # You must solve captcha. Case (1).
-                save_checkpoint(conference, year, authors, titles, links, idx, citations, etc)
-                raw_input("Solve captcha manually and press enter here to continue...")
-
-            except AQError:
-                # Replace the google url with one for other counturies. Case (2).
-                save_checkpoint(conference, year, authors, titles, links, idx, citations, etc)
-                if '.com' in GSCHOLAR_URL:
-                    GSCHOLAR_URL = GSCHOLAR_URL.replace('.com', '.co.kr')
-
-                elif '.co.kr' in GSCHOLAR_URL:
-                    GSCHOLAR_URL = GSCHOLAR_URL.replace('.co.kr', '.co.uk')
-
-                elif '.co.uk' in GSCHOLAR_URL:
-                    GSCHOLAR_URL = GSCHOLAR_URL.replace('.co.kr', '.ca')
-                
-                else:
-                    raise GScholarError()
-                
-                url = GSCHOLAR_URL.format(query)
-                driver.get(url)
-                
-            except SearchError:
-                # No Search Results. Case (3).
-                new_query = "\""+title.replace(' ', '+')+"\""
-                if query != new_query:
-                    print("Warning: No search result with link for \"{}\"".format(title))
-                    print("Retrying Search with the title...")
-                    query = new_query
-                    url = GSCHOLAR_URL.format(query)
-                    driver.get(url)
-
-                else:
-                    print("Error: No search result for \"{}\"".format(title))
-                    citations.append(0)
-                    etc.append("No Search Results")
-            
-            except Exception as e:
-                # Unknown Error. Case (4).
-                print("Error: No success.")
-                print(e)
-                import pdb; pdb.set_trace()
-                a=1
-    
-        if idx+1 == len(titles):
-            save_checkpoint(conference, year, authors, titles, links, idx+1, citations, etc)
-
-        # Delay
-        sleep(0.5)
-
-    # Create a dataset and sort by the number of citations
-    data = pd.DataFrame(list(zip(authors, titles, citations, links, etc)), index = [i+1 for i in range(len(authors))],
-                        columns=['Author', 'Title', 'Citations', 'Source', 'Etc'])
-    data.index.name = 'ID'
+def setup_backend(backend, lean=False, headless=False, block=BLOCK, profile_dir=None, attach=None):
+    '''
+    Return a function setting up a Google Scholar backend for a worker.
+    With "profile_dir", each worker keeps a Chrome profile at "{profile_dir}/{worker.profile}".
+    With "attach", each worker attaches to the Chrome at its address in the list instead of starting one.
+    '''
+    def driver(worker, lean):
+        profile = os.path.join(profile_dir, worker.profile) if profile_dir else None
+        address = attach[worker.worker_id] if attach else None
+        return setup_driver(lean, headless, profile, address)
+
+    if backend == 'http':
+        return lambda worker: HTTPBackend(lambda: driver(worker, False), attached=bool(attach))
+
+    urls = blocked_urls(block) if lean else None
+    return lambda worker: SeleniumBackend(driver(worker, lean), blocked_urls=urls, attached=bool(attach))
+
+
+def dedup_papers(chunks):
+    '''Drop front matter and papers listed twice from each chunk of (authors, titles, links) (see dedup.py).'''
+    tqdm = import_module('tqdm').tqdm
+    dedup = Deduplicator()
+    for chunk in chunks:
+        yield dedup.filter(*chunk)
+
+    metrics.count('duplicates_dropped', dedup.n_duplicates)
+    metrics.count('front_matter_dropped', dedup.n_front_matter)
+    if dedup.n_dropped > 0:
+        tqdm.write("Dropped {:d} duplicates and {:d} front matter entries of {:d} listed ({:d} queries saved).".format(
+            dedup.n_duplicates, dedup.n_front_matter, dedup.n_listed, dedup.n_dropped))
+
+def stream_papers(chunks, papers, journal):
+    '''
+    Extend the papers with each chunk of (authors, titles, links) as it is listed, and record it in the journal.
+    Yields the index of every paper as soon as it is listed.
+    '''
+    tqdm = import_module('tqdm').tqdm
+    for authors, titles, links in chunks:
+        indices = papers.extend(authors, titles, links)
+        journal.add_papers(authors, titles, links)
+        journal.carry(papers, indices)
+
+        for idx in indices:
+            yield idx
+
+    journal.complete()
+    tqdm.write("Found {:d} papers.".format(len(papers)))
+
+def resolve_offline(index_path, indices, papers, journal):
+    '''Resolve the citations of every paper left from the offline index, without any web query.'''
+    tqdm = import_module('tqdm').tqdm
+    index = OfflineIndex(index_path)
+    for idx in tqdm(indices):
+        if papers.is_resolved(idx):
+            continue
+
+        count = index.lookup(papers.links[idx], papers.titles[idx])
+        if count is not None:
+            papers.resolve(idx, count, "")
+            metrics.count('offline_index_hits')
+        else:
+            papers.resolve(idx, 0, "Not in Offline Index")
+            metrics.count('offline_index_misses')
+        journal.append(idx, papers.citations[idx], papers.etc[idx])
+
+    index.close()
+
+def refresh_papers(cache, indices, papers, journal, budget, year, month):
+    '''
+    Keep the cached counts of the papers, however old, except for those worth querying again within the "budget" (see refresh.py).
+    Returns the indices of the papers to query, in priority order.
+    Those keep their cached counts too until they are queried, in case the budget runs out first.
+    Every paper is planned, including those restored from a backup: papers refreshed by an interrupted refresh have just been fetched,
+    so they come last.
+    '''
+    indices = list(indices)
+    plan = plan_refresh(papers, indices, cache, budget, year, month)
+
+    queries = set(plan.queries)
+    for idx, (citations, etc) in plan.stale.items():
+        papers.resolve(idx, citations, etc)
+        if idx not in queries:
+            # Papers to query are journaled once queried, so that a restored run queries them.
+            journal.append(idx, citations, etc)
+    metrics.count('refresh_kept', len(plan.stale) - len(queries))
+
+    n_missing = sum(idx not in plan.scores for idx in plan.queries)
+    print("Refreshing {:d} of {:d} papers ({:d} never fetched) with a budget of {:d} queries.".format(
+        len(plan.queries), len(indices), n_missing, budget))
+
+    return plan.queries
+
+def query_scholar(pool, indices, papers, journal, budget=None):
+    '''
+    Query the citations of every paper left on Google Scholar, skipping those fresh in the citation cache.
+    Papers are handed to the pool as they are listed.
+    With a "budget" (refresh), every paper is queried regardless of the cache until "budget" queries are spent,
+    and the papers left (including those already queued) keep their counts.
+    '''
+    tqdm = import_module('tqdm').tqdm
+    start = pool.n_queries
+
+    def pending():
+        if budget is not None:
+            # The pool sends no query past the budget. Papers are only no longer queued once it is spent.
+            for idx in indices:
+                if pool.n_queries - start >= budget:
+                    return
+                yield idx
+            return
+
+        for idx in indices:
+            pbar.total = len(papers)
+            if papers.is_resolved(idx):
+                pbar.update(1)
+                continue
+
+            cached = pool.cache.lookup(papers.links[idx], papers.titles[idx]) if pool.cache is not None else None
+            if cached is not None:
+                # Fresh result from a previous run. No Google Scholar query.
+                papers.resolve(idx, *cached)
+                journal.append(idx, *cached)
+                pbar.update(1)
+                metrics.count('citation_cache_hits')
+
+            else:
+                metrics.count('citation_cache_misses')
+                yield idx
+
+    with tqdm(total=len(papers) if budget is None else len(indices)) as pbar:
+        pool.run(pending(), papers, journal, pbar, budget)
+
+    if budget is not None and pool.n_queries - start >= budget:
+        print("Refresh budget of {:d} queries spent.".format(budget))
+
+def save_rates(pool, path):
+    '''Report the query rates of each mirror for tuning.'''
+    rates = {}
+    for mirror, limiter in pool.limiters.items():
+        print("{}: {:.2f} queries/s ({:d} rate changes)".format(mirror, limiter.rate, len(limiter.history)-1))
+        rates[mirror] = {'rate': limiter.rate, 'history': limiter.history}
+
+    if rates:
+        with open(path, 'w') as f:
+            json.dump(rates, f, indent=2)
+
+def save_page_stats(pool, path):
+    '''Report the bytes transferred and the load time of the search results pages, to compare browser profiles.'''
+    if not pool.pages:
+        return
+
+    n_bytes = [i[0] for i in pool.pages]
+    seconds = [i[1] for i in pool.pages]
+    print("{:d} pages: {:.1f} KB and {:.2f}s per page on average.".format(
+        len(pool.pages), sum(n_bytes) / len(n_bytes) / 1024, sum(seconds) / len(seconds)))
+
+    with open(path, 'w') as f:
+        json.dump({'bytes': n_bytes, 'seconds': seconds}, f)
+
+def rank_papers(papers, year, month):
+    '''Create a dataset sorted by the number of citations, with the citations per year (and month).'''
+    data = papers.to_dataframe()
 
     # Sort by Citations
     data_ranked = data.sort_values(by='Citations', ascending=False)
@@ -273,10 +374,135 @@ def main():
         data_ranked.insert(5, 'cit/month', data_ranked['Citations'] / (month_diff + 1))
         data_ranked['cit/month'] = data_ranked['cit/month'].round(0).astype(int)
 
+    return data_ranked
+
+def run_job(args, conference, year, month, fetcher, pool, ask=query_yes_no, finished=True):
+    '''
+    Sort the papers of a conference-year and save them to a csv file. Returns the sorted dataset.
+    "ask" answers whether to restore from the backup. Without "finished", only a backup with papers left is offered,
+    and a finished one is replaced by a new run.
+    '''
+    if month is None:
+        print("Please provide month for \"cit/month\" information.")
+
+    journal = Journal(conference, year) # Checkpoint journal for this conference-year.
+    restored = False
+    backup = journal.replay()
+    if backup is not None and (finished or backup.n_resolved() < len(backup)):
+        papers = backup
+        restored = ask("Restore from backup? {} {} {}/{} papers done.".format(conference, year, papers.n_resolved(), len(papers)))
+    elif journal.carried and not ask("Restore from backup? {} {} {} papers done before the listing was interrupted.".format(conference, year, len(journal.carried))):
+        journal.carried = {}
+
+    if restored:
+        indices = range(len(papers))
+
+    else:
+        print("Loading {} {} results".format(conference, year))
+        if journal.carried:
+            print("Listing again, keeping the {:d} papers resolved so far.".format(len(journal.carried)))
+        if args.proceedings == 'dblp-xml':
+            dblp_index = DBLPIndex(args.dblp_index)
+            chunks = [dblp_index.get_papers_list(conference, year)]
+            dblp_index.close()
+
+        else:
+            # Papers are listed page by page while their citations are resolved.
+            chunks = iter_papers_list(conference, year, fetcher, args.proceedings_max_age)
+
+        papers = PaperTable()
+        journal.start(papers, complete=False)
+        indices = stream_papers(dedup_papers(chunks), papers, journal)
+
+    if args.source == 'offline-index':
+        resolve_offline(args.index_path, indices, papers, journal)
+    else:
+        if args.refresh is not None:
+            # Every paper is listed before planning, since the plan ranks them all.
+            indices = refresh_papers(pool.cache, indices, papers, journal, args.refresh, year, month)
+            query_scholar(pool, indices, papers, journal, args.refresh)
+        else:
+            query_scholar(pool, indices, papers, journal)
+        save_rates(pool, './temp/{}{}_rates.json'.format(conference, year))
+        save_page_stats(pool, './temp/{}{}_pages.json'.format(conference, year))
+
+    journal.close()
+
+    data_ranked = rank_papers(papers, year, month)
     print(data_ranked)
 
     # Save results
-    data_ranked.to_csv(os.path.join(csvpath, '{}{}'.format(conference, year)+'.csv'), encoding='utf-8') # Change the path
+    data_ranked.to_csv(os.path.join(args.csvpath, '{}{}'.format(conference, year)+'.csv'), encoding='utf-8') # Change the path
+    if args.snapshots:
+        SnapshotStore(args.snapshots).append(conference, year, data_ranked)
+
+    return data_ranked
+
+def serve(args, fetcher, pool, console):
+    '''Run the ranking service until interrupted, sorting the jobs requested with run_job.'''
+    def sort(conference, year, month, force):
+        with metrics.span('job', conference=conference, year=year):
+            # A backup left by an interrupted job is restored unless forced; nobody is at the terminal to answer.
+            # A finished one is not: the job is only run because its result is missing, stale or forced.
+            return run_job(args, conference, year, month, fetcher, pool, ask=lambda question: not force, finished=False)
+
+    service = RankingService(sort, lambda conference, year, month: check_job(conference, year, month, args.proceedings),
+                             ResultStore(ttl=args.result_ttl), pool, console)
+    try:
+        service.serve_forever(args.serve)
+    finally:
+        pool.close()
+        metrics.save_json(args.report)
+        if args.prometheus:
+            metrics.save_prometheus(args.prometheus)
+
+def main():
+    # Variables
+    args = get_command_line_args()
+    start_time = time.time()
+
+    # Shared by every job
+    fetcher = Fetcher(ProceedingsCache(), offline=args.offline)
+    cache = None
+    if not args.no_cache:
+        cache = CitationCache(args.cache_path, args.cache_ttl)
+    console = OperatorConsole() if args.serve is not None else None # One captcha console for every user of the service.
+    pool = ScholarPool(setup_backend(args.backend, args.lean, args.headless, args.block, args.profile_dir, args.attach), args.workers, cache, args.scholar_url, args.lookup,
+                       prompt=console.prompt if console is not None else None, debug=console is None, rate=args.rate, max_rate=args.max_rate)
+    metrics.observe('startup', time.perf_counter() - STARTED_AT) # Imports, arguments and caches, up to the first job.
+
+    if args.serve is not None:
+        serve(args, fetcher, pool, console)
+        return
+
+    results = []
+    profile_path = './temp/profile.prof' if args.profiler == 'cprofile' else './temp/profile.html'
+    try:
+        with profile(args.profiler, profile_path):
+            for conference, year, month in args.jobs:
+                with metrics.span('job', conference=conference, year=year):
+                    data_ranked = run_job(args, conference, year, month, fetcher, pool)
+                data_ranked.insert(0, 'Year', year)
+                data_ranked.insert(0, 'Conference', conference)
+                results.append(data_ranked)
+
+    finally:
+        pool.close()
+
+        # Export the metrics even if the run is cut short.
+        metrics.save_json(args.report)
+        if args.prometheus:
+            metrics.save_prometheus(args.prometheus)
+
+    if len(args.jobs) > 1:
+        # Combined ranking over every job, by citations per year.
+        combined = import_module('pandas').concat(results).sort_values(by='cit/year', ascending=False)
+        combined.to_csv(os.path.join(args.csvpath, 'Combined.csv'), encoding='utf-8')
+
+        elapsed = time.time() - start_time
+        n_papers = sum(len(i) for i in results)
+        print("Sorted {:d} papers in {:d} jobs in {:.0f}s ({:.0f} papers/hour, {:d} Google Scholar queries).".format(
+            n_papers, len(args.jobs), elapsed, n_papers / elapsed * 3600, pool.n_queries))
 
 if __name__ == '__main__':
-        main()
\ No newline at end of file
+        main()
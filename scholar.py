@@ -0,0 +1,463 @@
+import sys
+import threading
+import queue
+from urllib.parse import quote_plus
+
+from errors import *
+from matching import match_results
+from ratelimit import AdaptiveRateLimiter
+from metrics import metrics
+
+# Solve conflict between raw_input and input on Python 2 and Python 3
+if sys.version[0]=="3": raw_input=input
+
+GSCHOLAR_URL = "https://scholar.google.{mirror}/scholar?hl=en&as_sdt=0%2C5&q={query}&num={num}"
+MIRRORS = ['com', 'co.kr', 'co.uk', 'ca'] # Google Scholar addresses in the order of rotation.
+MATCH_NUM = 10 # Number of search results to match a paper against in the "match" lookup.
+QUEUE_SIZE = 100 # Number of papers queued ahead of the workers.
+LOAD_ATTEMPTS = 3 # Number of times a page timing out is loaded before giving up.
+
+class ScholarPool(object):
+    '''
+    Pool of Google Scholar workers sharing a queue of papers.
+
+    Each worker owns a backend (see backends.py) and a Google Scholar mirror, and pulls the index of the next paper from the shared queue.
+    The queue is bounded by "queue_size" and fed while the papers are still being listed:
+    the workers (and their browsers) start with the first paper, and keep going as the rest of the listing comes in.
+    Results are written to the PaperTable at the index of each paper, so the output order does not depend on the workers.
+    A worker asked to solve a captcha waits for the user while the others keep going.
+    A worker detected for automated queries moves on to its next mirror, and retires once every mirror is used up.
+    A worker failing on a paper (e.g., the page never loads) hands it back to the others and retires,
+    and "run" raises its error if no worker is left to finish the papers.
+    Workers and their backends are kept across calls to "run" until "close", so that batch jobs share them.
+    "setup_backend" is called with the worker to set up a backend for (e.g., to pick its browser profile).
+    Queries to each mirror are paced by an AdaptiveRateLimiter shared by the workers on that mirror.
+    "prompt" asks the user to solve a captcha and returns once it is solved (raw_input on the terminal by default).
+    With "debug", a worker opens the Python debugger on an unknown error; otherwise it retires with the error (e.g., in the service,
+    where nobody is at the debugger).
+
+    With the "link" lookup, a paper is searched with its proceedings link and then its title (ScholarWorker.query).
+    With the "match" lookup, a paper is searched once by its title and matched locally (ScholarWorker.query_match).
+    '''
+
+    def __init__(self, setup_backend, workers=1, cache=None, url=GSCHOLAR_URL, lookup='link', queue_size=QUEUE_SIZE, prompt=None,
+                 debug=True, **limiter_kwargs):
+        self.setup_backend = setup_backend
+        self.prompt = prompt if prompt is not None else raw_input
+        self.debug = debug
+        self.workers = workers
+        self.url = url
+        self.lookup = lookup
+        self.cache = cache
+        self.limiter_kwargs = limiter_kwargs
+        self.limiters = {} # Mirror -> AdaptiveRateLimiter
+        self.worker_list = []
+        self.journal = None
+        self.papers = None
+        self.n_queries = 0 # Number of search results pages loaded.
+        self.max_queries = None # Value of "n_queries" at which the query budget of the run is spent.
+        self.pages = [] # (Bytes, seconds) of each search results page read in the last run.
+        self.error = None # First error of a worker in the last run.
+
+        self.queue_size = queue_size
+        self.queue = queue.Queue(queue_size)
+        self.returned = [] # Papers handed back by retired workers.
+        self.lock = threading.Lock()
+        self.console = threading.Lock() # One prompt at a time on the terminal.
+        self.setup_lock = threading.Lock() # One backend setup at a time.
+        self.remaining = 0
+        self.producing = False # True while "run" is still feeding the queue.
+        self.stopped = False
+
+    def run(self, indices, papers, journal=None, pbar=None, budget=None):
+        '''
+        Query the papers at "indices" and fill in their citations and etc.
+        "indices" may be a generator extending "papers" as it goes.
+        With a "budget", no more than "budget" queries are sent: the papers left once it is spent are skipped,
+        keeping their citations and etc, including a paper whose title search would go over it.
+        '''
+        self.max_queries = self.n_queries + budget if budget is not None else None
+        self.journal = journal
+        self.papers = papers
+        self.pbar = pbar
+
+        self.queue = queue.Queue(self.queue_size)
+        self.returned = []
+        self.pages = []
+        self.error = None
+        self.remaining = 0
+        self.producing = True
+        self.stopped = False
+
+        threads = []
+        try:
+            for idx in indices:
+                if not threads:
+                    threads = self.start_workers(len(indices) if hasattr(indices, '__len__') else self.workers)
+
+                with self.lock:
+                    self.remaining += 1
+                self.put(idx, threads)
+
+        except BaseException:
+            # Stop the workers at their next paper.
+            self.stopped = True
+            raise
+
+        finally:
+            self.producing = False
+
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5) # Keep the main thread responsive to KeyboardInterrupt.
+
+        if self.remaining > 0:
+            # Every worker retired.
+            self.raise_error()
+
+    def progress(self):
+        '''Return the papers resolved and listed so far in the current (or last) run, or None before any run.'''
+        if self.papers is None:
+            return None
+
+        return self.papers.n_resolved(), len(self.papers)
+
+    def start_workers(self, n_papers):
+        '''Start the worker threads for a run. Returns the threads.'''
+        n_workers = min(self.workers, n_papers)
+        while len(self.worker_list) < n_workers:
+            self.worker_list.append(ScholarWorker(self, len(self.worker_list)))
+
+        threads = [threading.Thread(target=worker.run, daemon=True) for worker in self.worker_list[:n_workers]]
+        for thread in threads:
+            thread.start()
+
+        return threads
+
+    def put(self, idx, threads):
+        '''Queue a paper, waiting while the queue is full.'''
+        while True:
+            try:
+                self.queue.put(idx, timeout=0.5)
+                return
+            except queue.Full:
+                if not any(thread.is_alive() for thread in threads):
+                    # Every worker retired.
+                    self.raise_error()
+
+    def raise_error(self):
+        '''Raise the error that retired a worker, or GScholarError if the workers only ran out of mirrors.'''
+        if self.error is not None:
+            raise self.error
+        raise GScholarError()
+
+    def get(self):
+        '''Return the next paper for a worker, or None if there is none for now.'''
+        with self.lock:
+            if self.returned:
+                return self.returned.pop()
+
+        try:
+            return self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    def skip(self, idx):
+        '''Leave a paper unqueried, as the query budget is spent.'''
+        with self.lock:
+            self.remaining -= 1
+            if self.pbar is not None:
+                self.pbar.update(1)
+        metrics.count('budget_skipped')
+
+    def fail(self, idx, e):
+        '''Hand the paper of a worker failing with "e" back to the other workers (None if it had none).'''
+        with self.lock:
+            if idx is not None:
+                self.returned.append(idx)
+            if self.error is None:
+                self.error = e
+
+    def close(self):
+        '''Close the backends of every worker.'''
+        for worker in self.worker_list:
+            if worker.backend is not None:
+                worker.backend.close()
+                worker.backend = None
+
+    def limiter(self, mirror):
+        '''Return the rate limiter of a mirror.'''
+        with self.lock:
+            if mirror not in self.limiters:
+                self.limiters[mirror] = AdaptiveRateLimiter(**self.limiter_kwargs)
+
+            return self.limiters[mirror]
+
+    def record_page(self, stats):
+        '''Record the bytes transferred and the load time of a search results page.'''
+        if stats is not None:
+            with self.lock:
+                self.pages.append(stats)
+
+    def resolve(self, idx, citations, etc, mirror):
+        '''Record the result of a paper.'''
+        with self.lock:
+            self.papers.resolve(idx, citations, etc)
+            self.remaining -= 1
+
+            if self.journal is not None:
+                self.journal.append(idx, citations, etc)
+
+            if self.cache is not None:
+                self.cache.store(self.papers.links[idx], self.papers.titles[idx], citations, etc, mirror)
+
+            if self.pbar is not None:
+                self.pbar.update(1)
+
+class ScholarWorker(object):
+    '''A Google Scholar worker with its own backend and mirror.'''
+
+    def __init__(self, pool, worker_id):
+        self.pool = pool
+        self.worker_id = worker_id
+        self.backend = None
+        self.reset_mirrors()
+
+    def reset_mirrors(self):
+        # Each worker starts at a different mirror and rotates through the rest.
+        offset = self.worker_id % len(MIRRORS)
+        self.mirrors = MIRRORS[offset:] + MIRRORS[:offset]
+        self.retired = False
+
+    @property
+    def mirror(self):
+        return 'scholar.google.{}'.format(self.mirrors[0])
+
+    @property
+    def profile(self):
+        # Name of the browser profile of the worker, after the mirror it starts at (e.g., "scholar.google.com", "scholar.google.com-2").
+        offset = self.worker_id % len(MIRRORS)
+        rounds = self.worker_id // len(MIRRORS)
+        return 'scholar.google.{}'.format(MIRRORS[offset]) + ('-{}'.format(rounds + 1) if rounds > 0 else '')
+
+    @property
+    def tag(self):
+        return "[Worker {}] ".format(self.worker_id + 1) if self.pool.workers > 1 else ""
+
+    def url(self, query, num=1):
+        return self.pool.url.format(mirror=self.mirrors[0], query=query, num=num)
+
+    def run(self):
+        if self.retired:
+            # Retired in a previous run. Try every mirror again.
+            self.reset_mirrors()
+
+        if self.backend is None:
+            # Started with the first paper to query, so that runs resolved from the caches never start a browser.
+            try:
+                with self.pool.setup_lock, metrics.span('backend_setup'):
+                    self.backend = self.pool.setup_backend(self)
+            except Exception as e:
+                self.retire(None, e)
+                return
+
+        while not self.pool.stopped:
+            with metrics.span('queue_wait'):
+                idx = self.pool.get()
+            if idx is None:
+                if self.pool.remaining == 0 and not self.pool.producing:
+                    return
+                continue
+
+            try:
+                if self.pool.lookup == 'match':
+                    citations, etc = self.query_match(self.pool.papers.titles[idx], self.pool.papers.authors[idx])
+                else:
+                    citations, etc = self.query(self.pool.papers.titles[idx], self.pool.papers.links[idx])
+            except BudgetError:
+                self.pool.skip(idx)
+                continue
+            except GScholarError:
+                # Hand the paper over to the other workers.
+                with self.pool.lock:
+                    self.pool.returned.append(idx)
+                self.retired = True
+                print("{}No more alternative addresses. Retiring this worker.".format(self.tag))
+                return
+            except Exception as e:
+                self.retire(idx, e)
+                return
+
+            self.pool.resolve(idx, citations, etc, self.mirror)
+
+    def retire(self, idx, e):
+        '''Retire on an error the worker cannot handle, handing its paper (if any) back to the pool.'''
+        self.pool.fail(idx, e)
+        self.retired = True
+        print("{}Error: {} Retiring this worker.".format(self.tag, getattr(e, 'message', None) or repr(e)))
+
+    def load(self, query, num=1):
+        '''
+        Load a search results page as soon as the rate limiter of the mirror allows.
+        Raises BudgetError if the query budget of the run is spent.
+        '''
+        with self.pool.lock:
+            # Counted before it is sent, so that the workers never go over the budget together.
+            if self.pool.max_queries is not None and self.pool.n_queries >= self.pool.max_queries:
+                raise BudgetError()
+            self.pool.n_queries += 1
+
+        with metrics.span('rate_wait', mirror=self.mirror):
+            self.pool.limiter(self.mirror).acquire()
+        with metrics.span('load', mirror=self.mirror):
+            self.backend.load(self.url(query, num))
+
+        metrics.count('queries', mirror=self.mirror)
+
+    def read(self, query, num=1, first=True):
+        '''
+        Search Google Scholar and return the title, the authors snippet and the citations count of the first search result
+        (or every contents row if not "first").
+        SearchError is raised for empty search results.
+        '''
+        load_attempts = 0
+        loaded = False
+
+        while True:
+            """
+            While Loop 작동 매커니즘
+
+            구글 스콜라 검색 결과를 읽어와서 다음 예외 상황에 대처
+
+            Case (1) 캡차 풀기 요구 받은 경우
+            유저가 직접 캡차를 풀고, 터미널에 엔터를 입력해주면 계속 진행.
+            (다른 워커들은 그동안 계속 진행)
+
+            Case (2) Auto Query 감지에 걸린 경우
+            이 경우는 구글 국가를 변경하는 방법 외에는 Bypass 불가능.
+            워커마다 .com -> .co.kr -> .co.uk -> .ca 순으로 변경 (워커마다 시작 주소가 다름).
+            모두 소진한 워커는 종료. 모든 워커가 종료되면 프로그램 종료 (프로그램 다시 시작하면 됨).
+
+            Case (3) 검색 결과가 없음
+            SearchError를 호출한 쪽으로 전달 (query, query_match 참고).
+
+            Case (4) 페이지 로딩 시간 초과 또는 연결 오류
+            같은 페이지를 다시 불러옴 (최대 LOAD_ATTEMPTS회). 모두 실패하면 LoadError를 호출한 쪽으로 전달
+            (워커는 논문을 다른 워커에게 넘기고 종료, run 참고).
+
+            Case (5) 알 수 없는 에러
+            Python debugger 실행 (debug가 꺼져 있으면 Case (4)와 같이 워커 종료).
+            """
+
+            try:
+                if not loaded:
+                    # First load, or a reload after a timeout or on the next mirror.
+                    loaded = True
+                    self.load(query, num)
+
+                # Try getting gscholar search results.
+                gs_content = self.backend.first_result() if first else self.backend.contents(False)
+                self.pool.limiter(self.mirror).success()
+                self.pool.record_page(self.backend.page_stats())
+                return gs_content
+
+            except RobotError:
+                # You must solve captcha. Case (1).
+                self.pool.limiter(self.mirror).failure('captcha')
+                metrics.count('captchas', mirror=self.mirror)
+                if self.pool.journal is not None:
+                    self.pool.journal.sync()
+                with self.pool.console, metrics.span('captcha_wait'):
+                    self.pool.prompt("{}Solve captcha manually on Chrome and press enter here to continue...".format(self.tag))
+                if self.backend.captcha_solved():
+                    # Requested again like any query: paced, counted and within the budget.
+                    loaded = False
+
+            except AQError:
+                # Replace the google url with one for other counturies. Case (2).
+                self.pool.limiter(self.mirror).failure('automated queries')
+                metrics.count('aq_rotations', mirror=self.mirror)
+                if self.pool.journal is not None:
+                    self.pool.journal.sync()
+                if len(self.mirrors) == 1:
+                    raise GScholarError()
+
+                self.mirrors = self.mirrors[1:]
+                loaded = False
+
+            except SearchError:
+                # No Search Results. Case (3).
+                self.pool.limiter(self.mirror).success()
+                self.pool.record_page(self.backend.page_stats())
+                raise
+
+            except LoadError as e:
+                # The page did not load in time, or did not load at all. Case (4).
+                load_attempts += 1
+                if load_attempts >= LOAD_ATTEMPTS:
+                    raise
+
+                print("{}Warning: {} Reloading...".format(self.tag, e.message))
+                metrics.count('retries', reason='timeout')
+                loaded = False
+
+            except BudgetError:
+                # No query left in the budget of the run (see ScholarPool.run).
+                raise
+
+            except Exception as e:
+                # Unknown Error. Case (5).
+                self.debug(e)
+
+    def debug(self, e):
+        '''Open the Python debugger on an error the worker cannot handle, or raise it if the pool does not debug.'''
+        if not self.pool.debug:
+            raise e
+
+        with self.pool.console:
+            print("{}Error: No success.".format(self.tag))
+            print(e)
+            import pdb; pdb.set_trace()
+            a=1
+
+    def query(self, title, link):
+        '''
+        Query a paper on Google Scholar and return its citations and "Etc" log.
+        The paper is searched with its proceedings link, then with its title if there is no search result.
+        '''
+        query = link.replace("https://doi.org/", "").replace(':', '%3A').replace('/', '%2F')
+        try:
+            title_, authors_, citations = self.read(query)
+
+        except SearchError:
+            print("{}Warning: No search result with link for \"{}\"".format(self.tag, title))
+            print("Retrying Search with the title...")
+            metrics.count('retries', reason='title')
+            try:
+                title_, authors_, citations = self.read("\""+title.replace(' ', '+')+"\"")
+
+            except SearchError:
+                print("{}Error: No search result for \"{}\"".format(self.tag, title))
+                return 0, "No Search Results"
+
+        return citations, ""
+
+    def query_match(self, title, authors):
+        '''
+        Query a paper on Google Scholar with a single search by its title,
+        and match the search results locally against the title and authors (see matching.py).
+        The confidence of the match is logged in "Etc".
+        '''
+        try:
+            gs_contents = self.read(quote_plus(title), num=MATCH_NUM, first=False)
+
+        except SearchError:
+            print("{}Error: No search result for \"{}\"".format(self.tag, title))
+            return 0, "No Search Results"
+
+        citations, confidence = match_results(gs_contents, title, authors)
+        if citations is None:
+            print("{}Error: No matching search result for \"{}\"".format(self.tag, title))
+            return 0, "No Matching Result (Confidence {:.2f})".format(confidence)
+
+        return citations, "Confidence {:.2f}".format(confidence)
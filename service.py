@@ -0,0 +1,303 @@
+import os, io, csv, sys, json, time, uuid
+import queue
+import sqlite3
+import threading
+import traceback
+from urllib.parse import urlparse, parse_qs
+
+# Default Parameters
+SERVICE_PORT = 8765
+RESULTS_PATH = './temp/results.sqlite'
+RESULT_TTL = 7 # Days a stored ranking is served without sorting the conference again.
+
+class ResultStore(object):
+    '''
+    Rankings sorted by the service, backed by SQLite, as the csv text run.py saves.
+    Each row is keyed by the conference, the year and the month (0 if not given), and keeps the time it was sorted.
+    '''
+
+    def __init__(self, path=RESULTS_PATH, ttl=RESULT_TTL):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                          "conference TEXT, year INTEGER, month INTEGER, csv TEXT, sorted_at REAL, "
+                          "PRIMARY KEY (conference, year, month))")
+        self.conn.commit()
+
+    def get(self, conference, year, month):
+        '''Return (csv, sorted_at) of a fresh ranking, otherwise None.'''
+        with self.lock:
+            row = self.conn.execute("SELECT csv, sorted_at FROM results WHERE conference = ? AND year = ? AND month = ?",
+                                    (conference, year, month or 0)).fetchone()
+        if row is None:
+            return None
+
+        if self.ttl is not None and time.time() - row[1] > self.ttl * 86400:
+            # Stale ranking.
+            return None
+
+        return row
+
+    def put(self, conference, year, month, csv_text):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO results (conference, year, month, csv, sorted_at) VALUES (?, ?, ?, ?, ?)",
+                              (conference, year, month or 0, csv_text, time.time()))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class OperatorConsole(object):
+    '''
+    Single console for the captchas of every worker, in place of a raw_input per worker.
+
+    "prompt" (given to ScholarPool) lists the captcha and blocks the worker until the operator marks it solved,
+    by pressing enter on the terminal of the service (the oldest captcha first) or through the API.
+    '''
+
+    def __init__(self, stdin=True):
+        self.lock = threading.Lock()
+        self.pending = {} # Captcha ID -> (message, shown_at, threading.Event)
+
+        if stdin:
+            threading.Thread(target=self.read_stdin, daemon=True).start()
+
+    def prompt(self, message):
+        captcha_id = uuid.uuid4().hex[:8]
+        solved = threading.Event()
+        with self.lock:
+            self.pending[captcha_id] = (message, time.time(), solved)
+        print("[Captcha {}] {} ({:d} waiting)".format(captcha_id, message, len(self.pending)))
+
+        solved.wait()
+
+    def solve(self, captcha_id=None):
+        '''Mark a captcha (the oldest if None) solved. Returns False if there is no such captcha.'''
+        with self.lock:
+            if captcha_id is None and self.pending:
+                captcha_id = min(self.pending, key=lambda i: self.pending[i][1])
+            if captcha_id not in self.pending:
+                return False
+
+            solved = self.pending.pop(captcha_id)[2]
+
+        solved.set()
+        return True
+
+    def list(self):
+        with self.lock:
+            return [{'id': captcha_id, 'message': message, 'shown_at': shown_at}
+                    for captcha_id, (message, shown_at, _) in sorted(self.pending.items(), key=lambda i: i[1][1])]
+
+    def read_stdin(self):
+        for _ in sys.stdin:
+            self.solve()
+
+class Job(object):
+    '''A ranking requested from the service.'''
+
+    def __init__(self, conference, year, month, force=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.conference = conference
+        self.year = year
+        self.month = month
+        self.force = force # Sort again from scratch, even over a backup of the conference-year.
+        self.state = 'queued' # queued -> running -> done / failed
+        self.cached = False # Served from the result store.
+        self.csv = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def key(self):
+        return (self.conference, self.year, self.month)
+
+    def to_dict(self, progress=None):
+        return {'id': self.id, 'conference': self.conference, 'year': self.year, 'month': self.month,
+                'state': self.state, 'cached': self.cached, 'error': self.error, 'progress': progress,
+                'submitted_at': self.submitted_at, 'finished_at': self.finished_at}
+
+class RankingService(object):
+    '''
+    Ranking service sharing one set of Google Scholar workers, caches and captcha console among every user.
+
+    Jobs are sorted one at a time by "sort" (conference, year, month, force), which returns the ranking as a DataFrame,
+    after "validate" (e.g., run.check_job) normalizes the request.
+    A request for a ranking still fresh in the result store is served at once, and a request identical to a job
+    queued or running is coalesced into it, so that each conference is sorted once however many ask for it.
+    '''
+
+    def __init__(self, sort, validate, store, pool=None, console=None):
+        self.sort = sort
+        self.validate = validate
+        self.store = store
+        self.pool = pool
+        self.console = console
+
+        self.lock = threading.Lock()
+        self.jobs = {} # Job ID -> Job
+        self.active = {} # (conference, year, month) -> Job queued or running
+        self.queue = queue.Queue()
+        self.running = None
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, conference, year, month=None, force=False):
+        '''Return the job for a ranking request. Raises ValueError for an invalid request.'''
+        conference, year, month = self.validate(conference, year, month)
+
+        with self.lock:
+            job = self.active.get((conference, year, month))
+            if job is not None:
+                if force and job.state == 'queued':
+                    job.force = True
+                return job
+
+            job = Job(conference, year, month, force)
+            self.jobs[job.id] = job
+
+            stored = self.store.get(conference, year, month) if not force else None
+            if stored is not None:
+                job.state, job.cached, job.csv, job.finished_at = 'done', True, stored[0], time.time()
+                return job
+
+            self.active[job.key] = job
+
+        self.queue.put(job)
+        return job
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                job.state = 'running'
+                self.running = job
+
+            try:
+                data_ranked = self.sort(job.conference, job.year, job.month, job.force)
+                job.csv = data_ranked.to_csv(encoding='utf-8')
+                self.store.put(job.conference, job.year, job.month, job.csv)
+                job.state = 'done'
+
+            except Exception as e:
+                traceback.print_exc()
+                job.error = '{}: {}'.format(type(e).__name__, e)
+                job.state = 'failed'
+
+            with self.lock:
+                job.finished_at = time.time()
+                self.running = None
+                self.active.pop(job.key, None)
+
+    def progress(self, job):
+        '''Return the papers resolved and listed so far for a running job, otherwise None.'''
+        if job is not self.running or self.pool is None:
+            return None
+
+        progress = self.pool.progress()
+        if progress is None:
+            return None
+
+        return {'resolved': progress[0], 'total': progress[1]}
+
+    def status(self, job):
+        return job.to_dict(self.progress(job))
+
+    def serve_forever(self, port=SERVICE_PORT, host='127.0.0.1'):
+        import http.server # Only the service needs it (see metrics.import_module).
+        server = http.server.ThreadingHTTPServer((host, port), make_handler(self))
+        server.daemon_threads = True
+        print("Serving rankings at http://{}:{:d}/jobs".format(host, port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.store.close()
+
+def make_handler(service):
+    '''
+    HTTP API of a RankingService:
+
+    POST /jobs                 Request a ranking, with a JSON body {"conference", "year", "month" (optional), "force" (optional)}.
+    GET  /jobs                 Every job.
+    GET  /jobs/{id}            State and progress of a job.
+    GET  /jobs/{id}/result     Ranking of a finished job, as JSON records or as csv with "?format=csv".
+    GET  /captchas             Captchas waiting for the operator.
+    POST /captchas/{id}        Mark a captcha solved ("oldest" for the oldest).
+    '''
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [i for i in url.path.split('/') if i]
+
+            if parts == ['jobs']:
+                with service.lock:
+                    jobs = list(service.jobs.values())
+                return self.send_json(200, [service.status(job) for job in jobs])
+
+            if parts == ['captchas'] and service.console is not None:
+                return self.send_json(200, service.console.list())
+
+            if len(parts) in [2, 3] and parts[0] == 'jobs':
+                job = service.jobs.get(parts[1])
+                if job is None:
+                    return self.send_json(404, {'error': 'No job {}.'.format(parts[1])})
+
+                if len(parts) == 2:
+                    return self.send_json(200, service.status(job))
+
+                if parts[2] == 'result':
+                    if job.state != 'done':
+                        return self.send_json(409, dict(service.status(job), error='The job is {}.'.format(job.state)))
+
+                    if parse_qs(url.query).get('format', ['json'])[0] == 'csv':
+                        return self.send(200, job.csv.encode('utf-8'), 'text/csv; charset=utf-8')
+                    return self.send_json(200, list(csv.DictReader(io.StringIO(job.csv))))
+
+            self.send_json(404, {'error': 'Not found.'})
+
+        def do_POST(self):
+            parts = [i for i in urlparse(self.path).path.split('/') if i]
+
+            if parts == ['jobs']:
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                    job = service.submit(str(request['conference']), int(request['year']),
+                                         int(request['month']) if request.get('month') else None, bool(request.get('force')))
+                except (KeyError, ValueError, TypeError) as e:
+                    return self.send_json(400, {'error': '{}: {}'.format(type(e).__name__, e)})
+
+                return self.send_json(200 if job.state == 'done' else 202, service.status(job))
+
+            if len(parts) == 2 and parts[0] == 'captchas' and service.console is not None:
+                if not service.console.solve(None if parts[1] == 'oldest' else parts[1]):
+                    return self.send_json(404, {'error': 'No captcha {}.'.format(parts[1])})
+                return self.send_json(200, service.console.list())
+
+            self.send_json(404, {'error': 'Not found.'})
+
+        def send_json(self, status, obj):
+            self.send(status, json.dumps(obj).encode('utf-8'), 'application/json')
+
+        def send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,235 @@
+import sys, time, random, argparse
+import threading
+import http.server
+from urllib.parse import urlparse, parse_qs
+
+from contents import ERROR_KW, ROBOT_KW, EMPTY_KW
+from backends import HTTPBackend
+from scholar import ScholarPool
+from papers import PaperTable
+from metrics import metrics
+from benchmark import track, RESULTS_PATH
+
+# Default Parameters
+PAPERS = 10000 # Papers of the synthetic conference.
+WORKERS = 2
+LATENCY = 0.005 # Seconds to answer a query, before jitter.
+JITTER = 0.5 # Relative spread of the latency (uniform).
+EMPTY = 0.05 # Fraction of the papers without results for their link, so that they are searched again by title.
+ROBOT_EVERY = 1000 # Queries to a mirror between captchas (None for no captcha).
+AQ_AFTER = 3000 # Queries to a mirror before it detects automated queries for good (None for never).
+SOLVE_SECONDS = 0.5 # Seconds the simulated user takes to solve a captcha.
+RATE = 1000. # Queries per second for each mirror. The simulator does not pace queries.
+
+ROBOT_PAGE = '<html><body><form id="gs_captcha_f"><h1>Please show you\'re {}</h1></form></body></html>'.format(ROBOT_KW[1])
+AQ_PAGE = '<html><body><div id="gs_res_ccl"><h1>We\'re sorry...</h1><p>... but {} ...</p></div></body></html>'.format(ERROR_KW[0])
+EMPTY_PAGE = '<html><body><div id="gs_res_ccl_mid"><div class="gs_r">Your search did not match any articles. {}.</div></div></body></html>'.format(EMPTY_KW[1])
+RESULTS_PAGE = ('<html><body><div id="gs_res_ccl_mid"><div class="gs_r gs_or gs_scl"><div class="gs_ri">'
+                '<h3 class="gs_rt"><a href="#">{title}</a></h3><div class="gs_a">{authors} - Synthetic Conference, 2020</div>'
+                '<div class="gs_fl"><a href="#">Save</a> <a href="#">Cite</a> <a href="/scholar?cites=1">Cited by {citations}</a></div>'
+                '</div></div></div></body></html>')
+
+class Catalog(object):
+    '''Synthetic conference: the papers, with the citations and whether their link is found, by Google Scholar query.'''
+
+    def __init__(self, n_papers=PAPERS, empty=EMPTY, seed=0):
+        rng = random.Random(seed)
+        words = ['learning', 'neural', 'graph', 'robust', 'efficient', 'attention', 'networks', 'vision', 'language', 'models']
+
+        self.papers = PaperTable()
+        self.citations = []
+        self.by_link = {}
+        self.by_title = {}
+        for i in range(n_papers):
+            title = 'Synthetic Paper {} on {}'.format(i, ' '.join(rng.choice(words) for _ in range(4)))
+            authors = ', '.join('Author {}'.format(rng.randrange(n_papers)) for _ in range(3))
+            link = 'https://doi.org/10.5555/sim.{}'.format(i)
+            self.papers.extend([authors], [title], [link])
+            self.citations.append(rng.randrange(5000))
+
+            if rng.random() >= empty:
+                self.by_link[link.replace('https://doi.org/', '')] = i
+            self.by_title[title] = i
+
+    def find(self, query):
+        '''Return the index of the paper searched by "query" (a link or a quoted title), or None.'''
+        query = query.strip('"')
+        if query in self.by_link:
+            return self.by_link[query]
+        return self.by_title.get(query)
+
+class Simulator(object):
+    '''
+    Local stand-in for Google Scholar answering the queries of a Catalog, at "{url}" (e.g., with "--scholar-url" of run.py).
+
+    Each query takes "latency" seconds (with "jitter"), per request so that workers overlap as with Google Scholar.
+    Every "robot_every" queries to a mirror, the mirror shows a captcha until "solve" is called,
+    and after "aq_after" queries it shows the automated queries banner for good, so that the workers move to their next mirror.
+    '''
+
+    def __init__(self, catalog, latency=LATENCY, jitter=JITTER, robot_every=ROBOT_EVERY, aq_after=AQ_AFTER, seed=0):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.robot_every = robot_every
+        self.aq_after = aq_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.queries = {} # Mirror -> queries answered.
+        self.captcha = set() # Mirrors showing a captcha.
+
+        simulator = self
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = simulator.answer(self.path).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:{}/{{mirror}}/scholar?q={{query}}&num={{num}}'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, path):
+        '''Return the page for a request path "/{mirror}/scholar?q=...".'''
+        url = urlparse(path)
+        mirror = url.path.split('/')[1]
+        query = parse_qs(url.query).get('q', [''])[0]
+
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter, self.jitter)
+            if mirror in self.captcha:
+                return ROBOT_PAGE
+
+            n = self.queries.get(mirror, 0)
+            if self.aq_after is not None and n >= self.aq_after:
+                return AQ_PAGE
+
+            if self.robot_every is not None and n > 0 and n % self.robot_every == 0 and mirror not in self.captcha:
+                self.captcha.add(mirror)
+                self.queries[mirror] = n + 1 # The captcha is shown once per "robot_every" queries.
+                return ROBOT_PAGE
+
+            self.queries[mirror] = n + 1
+
+        time.sleep(max(self.latency * (1 + jitter), 0))
+
+        idx = self.catalog.find(query)
+        if idx is None:
+            return EMPTY_PAGE
+
+        return RESULTS_PAGE.format(title=self.catalog.papers.titles[idx], authors=self.catalog.papers.authors[idx],
+                                   citations=self.catalog.citations[idx])
+
+    def solve(self):
+        '''Lift every captcha shown.'''
+        with self.lock:
+            self.captcha.clear()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def simulate(n_papers=PAPERS, workers=WORKERS, latency=LATENCY, jitter=JITTER, empty=EMPTY, robot_every=ROBOT_EVERY,
+             aq_after=AQ_AFTER, solve_seconds=SOLVE_SECONDS, rate=RATE, lookup='link', seed=0):
+    '''
+    Rank a synthetic conference of "n_papers" through the query loop (ScholarPool with the HTTP backend) against a Simulator,
+    with a simulated user solving each captcha in "solve_seconds". Returns the benchmark result.
+    '''
+    catalog = Catalog(n_papers, empty, seed)
+    simulator = Simulator(catalog, latency, jitter, robot_every, aq_after, seed)
+
+    def solve_captcha(message):
+        time.sleep(solve_seconds)
+        simulator.solve()
+
+    pool = ScholarPool(lambda worker: HTTPBackend(), workers, url=simulator.url, lookup=lookup, prompt=solve_captcha,
+                       rate=rate, max_rate=rate)
+    papers = PaperTable(catalog.papers.authors, catalog.papers.titles, catalog.papers.links)
+
+    # Timed without tracemalloc (see benchmark.measure), which would slow the workers down by half.
+    metrics.reset()
+    start = time.perf_counter()
+    try:
+        pool.run(range(len(papers)), papers)
+        seconds = time.perf_counter() - start
+    finally:
+        pool.close()
+        simulator.close()
+
+    counters = {}
+    for counter in metrics.report()['counters']:
+        name = counter['name'] + ('_' + counter['labels']['reason'] if 'reason' in counter['labels'] else '')
+        counters[name] = counters.get(name, 0) + counter['value']
+
+    n_correct = sum(papers.citations[idx] == catalog.citations[idx] for idx in range(len(papers)))
+    return {'benchmark': 'Simulated Scholar ({:d} papers)'.format(n_papers), 'backend': 'http', 'items': len(papers),
+            'seconds': seconds, 'throughput': len(papers) / seconds, 'peak_mb': peak_rss() / 2**20,
+            'workers': workers, 'queries': pool.n_queries, 'correct': n_correct / len(papers),
+            'captchas': counters.get('captchas', 0), 'aq_rotations': counters.get('aq_rotations', 0),
+            'title_retries': counters.get('retries_title', 0)}
+
+def peak_rss():
+    '''Peak resident memory of the process in bytes, or 0 where the resource module is missing (e.g., Windows).'''
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+def serve(catalog, **kwargs):
+    '''Run a Simulator until interrupted, e.g. to point "run.py --scholar-url" at it.'''
+    simulator = Simulator(catalog, **kwargs)
+    print("Simulating Google Scholar for {:d} papers at {}".format(len(catalog.papers), simulator.url))
+    print("Press enter to solve the captchas shown, Ctrl+C to stop.")
+    try:
+        while True:
+            input()
+            simulator.solve()
+    except (KeyboardInterrupt, EOFError):
+        simulator.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Google Scholar query loop against a local Google Scholar simulator.')
+    parser.add_argument('command', type=str, choices=['run', 'serve'], help='"run" ranks a synthetic conference against the simulator and records the throughput, "serve" only runs the simulator.')
+    parser.add_argument('--papers', type=int, default=PAPERS, help='Papers of the synthetic conference. (Default: {})'.format(PAPERS))
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Workers querying the simulator. (Default: {})'.format(WORKERS))
+    parser.add_argument('--lookup', type=str, default='link', choices=['link', 'match'], help='Lookup of the workers (see run.py). (Default: link)')
+    parser.add_argument('--latency', type=float, default=LATENCY, help='Seconds to answer a query. (Default: {})'.format(LATENCY))
+    parser.add_argument('--jitter', type=float, default=JITTER, help='Relative spread of the latency. (Default: {})'.format(JITTER))
+    parser.add_argument('--empty', type=float, default=EMPTY, help='Fraction of papers not found by their link. (Default: {})'.format(EMPTY))
+    parser.add_argument('--robot-every', type=int, default=ROBOT_EVERY, help='Queries to a mirror between captchas, 0 for none. (Default: {})'.format(ROBOT_EVERY))
+    parser.add_argument('--aq-after', type=int, default=AQ_AFTER, help='Queries to a mirror before it detects automated queries, 0 for never. (Default: {})'.format(AQ_AFTER))
+    parser.add_argument('--solve-seconds', type=float, default=SOLVE_SECONDS, help='Seconds to solve a captcha with "run". (Default: {})'.format(SOLVE_SECONDS))
+    parser.add_argument('--rate', type=float, default=RATE, help='Queries per second for each mirror with "run". (Default: {})'.format(RATE))
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic conference and the latency. (Default: 0)')
+    parser.add_argument('--results', type=str, default=RESULTS_PATH, help='Path of the results history. (Default: {})'.format(RESULTS_PATH))
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error if the throughput regressed.')
+    args = parser.parse_args()
+
+    robot_every = args.robot_every or None
+    aq_after = args.aq_after or None
+
+    if args.command == 'serve':
+        serve(Catalog(args.papers, args.empty, args.seed), latency=args.latency, jitter=args.jitter,
+              robot_every=robot_every, aq_after=aq_after, seed=args.seed)
+        return
+
+    result = simulate(args.papers, args.workers, args.latency, args.jitter, args.empty, robot_every, aq_after,
+                      args.solve_seconds, args.rate, args.lookup, args.seed)
+    print("{:d} queries, {:d} captchas, {:d} mirror rotations, {:d} title retries, {:.1%} correct.".format(
+        result['queries'], result['captchas'], result['aq_rotations'], result['title_retries'], result['correct']))
+
+    n_regressions = track([result], args.results)
+    if n_regressions > 0 and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+import os, re, argparse, datetime
+
+from contents import normalize_title
+from metrics import import_module
+
+# Default Parameters
+SNAPSHOTS_DIR = './temp/snapshots'
+TOP = 20 # Rows shown by a query.
+ROW_GROUP_SIZE = 65536 # Rows of each Parquet row group of the indexes, the unit read by a query.
+
+# Columns of the rankings kept, from the columns of the csv output.
+COLUMNS = {'ID': 'id', 'Author': 'authors', 'Title': 'title', 'Citations': 'citations', 'Source': 'source',
+           'cit/year': 'cit_year', 'cit/month': 'cit_month', 'Etc': 'etc'}
+
+def split_authors(authors):
+    '''Names in an authors string ("A, B and C").'''
+    return [i.strip() for i in re.split(r",| and ", authors) if i.strip()]
+
+class SnapshotStore(object):
+    '''
+    Rankings of every run, kept as Parquet files partitioned by conference, year and snapshot (the date of the run):
+    "papers/conference={}/year={}/snapshot={}/part-0.parquet". A run on the same day replaces the snapshot of that day.
+
+    Indexes over every snapshot are updated on each append, so that queries read a single file:
+    "authors.parquet" has a row per author of each paper, "titles.parquet" a row per paper, sorted by normalized name and title,
+    and "rollups.parquet" the totals, means and medians of the citations, "cit/year" and "cit/month" of each snapshot.
+    Rows of the latest and the earliest snapshot of each conference-year are flagged and stored first,
+    so that the queries on them (the most common) skip the row groups of every other snapshot.
+    Requires pyarrow.
+    '''
+
+    def __init__(self, dirname=SNAPSHOTS_DIR):
+        self.dirname = dirname
+        self.pd = import_module('pandas')
+        try:
+            import_module('pyarrow')
+        except ImportError:
+            print("Please install pyarrow.")
+            raise
+
+    def path(self, name):
+        return os.path.join(self.dirname, name)
+
+    def append(self, conference, year, data_ranked, snapshot=None):
+        '''Add the ranking of a run (as returned by run.rank_papers) as a snapshot. Returns the snapshot.'''
+        pd = self.pd
+        snapshot = snapshot or datetime.date.today().isoformat()
+
+        data = data_ranked.reset_index().rename(columns=COLUMNS)
+        data = data[[i for i in COLUMNS.values() if i in data.columns]]
+        if 'cit_month' not in data.columns:
+            data['cit_month'] = float('nan')
+        data['citations'] = pd.to_numeric(data['citations'], errors='coerce').fillna(0).astype('int64')
+        data['rank'] = data['citations'].rank(method='min', ascending=False).astype('int64')
+        data['authors'] = data['authors'].fillna('').astype(str)
+        data['title'] = data['title'].fillna('').astype(str)
+
+        partition = self.path(os.path.join('papers', 'conference={}'.format(conference), 'year={}'.format(year), 'snapshot={}'.format(snapshot)))
+        if not os.path.isdir(partition):
+            os.makedirs(partition)
+        write_parquet(data, os.path.join(partition, 'part-0.parquet'))
+
+        data['conference'] = conference
+        data['year'] = year
+        data['snapshot'] = snapshot
+        data['title_key'] = data['title'].map(normalize_title)
+
+        titles = data[['title_key', 'title', 'conference', 'year', 'snapshot', 'id', 'rank', 'citations', 'cit_year', 'cit_month', 'source']]
+        self.update_index('titles.parquet', titles, conference, year, snapshot, ['title_key', 'conference', 'year', 'snapshot'])
+
+        authors = data[['authors', 'title_key', 'conference', 'year', 'snapshot', 'id', 'rank', 'citations', 'cit_year']].copy()
+        authors['name'] = authors.pop('authors').map(split_authors)
+        authors = authors.explode('name').dropna(subset=['name'])
+        authors['author'] = authors['name'].map(normalize_title)
+        authors = authors[authors['author'] != '']
+        self.update_index('authors.parquet', authors, conference, year, snapshot, ['author', 'conference', 'year', 'snapshot'])
+
+        rollup = data.groupby(['conference', 'year', 'snapshot']).agg(
+            papers=('citations', 'size'), citations=('citations', 'sum'), citations_mean=('citations', 'mean'),
+            citations_median=('citations', 'median'), citations_max=('citations', 'max'),
+            cit_year=('cit_year', 'sum'), cit_year_mean=('cit_year', 'mean'), cit_year_median=('cit_year', 'median'),
+            cit_month_mean=('cit_month', 'mean'), cit_month_median=('cit_month', 'median')).reset_index()
+        self.update_index('rollups.parquet', rollup, conference, year, snapshot, ['conference', 'year', 'snapshot'])
+
+        return snapshot
+
+    def update_index(self, name, rows, conference, year, snapshot, sort_by):
+        '''Replace the rows of a snapshot in an index.'''
+        pd = self.pd
+        index = self.read(name)
+        if index is not None:
+            index = index[~((index['conference'] == conference) & (index['year'] == year) & (index['snapshot'] == snapshot))]
+            index = index.drop(columns=['latest', 'earliest'])
+            rows = pd.concat([index.astype({'conference': str, 'snapshot': str}), rows], ignore_index=True)
+
+        snapshots = rows.groupby(['conference', 'year'])['snapshot']
+        rows['latest'] = rows['snapshot'] == snapshots.transform('max')
+        rows['earliest'] = rows['snapshot'] == snapshots.transform('min')
+        rows = rows.sort_values(['latest', 'earliest'] + sort_by, ascending=[False, False] + [True] * len(sort_by), kind='stable')
+
+        # Repeated strings are stored (and read back) as categories.
+        rows = rows.astype({'conference': 'category', 'snapshot': 'category'})
+        write_parquet(rows.reset_index(drop=True), self.path(name), ROW_GROUP_SIZE)
+
+    def read(self, name, columns=None, filters=None):
+        '''Read an index, or None if there is none yet.'''
+        path = self.path(name)
+        if not os.path.isfile(path):
+            return None
+
+        return self.pd.read_parquet(path, columns=columns, filters=filters)
+
+    def papers(self, conference, year, snapshot):
+        '''Return the ranking of a snapshot.'''
+        return self.pd.read_parquet(self.path(os.path.join(
+            'papers', 'conference={}'.format(conference), 'year={}'.format(year), 'snapshot={}'.format(snapshot), 'part-0.parquet')))
+
+    def select(self, name, conferences=None, years=None, snapshot='latest', columns=None, filters=None):
+        '''
+        Rows of an index for the conferences and the (first, last) range of years given (every one if None),
+        at a snapshot of each conference-year: "latest", "earliest" or a date (the latest on or before it).
+        "filters" are more filters for pandas.read_parquet.
+        '''
+        filters = list(filters or [])
+        if conferences:
+            filters.append(('conference', 'in', list(conferences)))
+        if years:
+            filters.append(('year', '>=', years[0]))
+            filters.append(('year', '<=', years[1]))
+
+        if snapshot in ['latest', 'earliest']:
+            filters.append((snapshot, '==', True))
+
+        data = self.read(name, columns, filters or None)
+        if data is None or len(data) == 0:
+            return data
+
+        # Categories (see update_index) as plain strings, so that selections of any snapshot merge and compare alike.
+        data = data.astype({i: str for i in ['conference', 'snapshot'] if i in data.columns})
+        if snapshot in ['latest', 'earliest']:
+            return data
+
+        data = data[data['snapshot'] <= snapshot]
+        pick = data.groupby(['conference', 'year'])['snapshot'].transform('max')
+
+        return data[data['snapshot'] == pick]
+
+    def top_authors(self, conferences=None, years=None, snapshot='latest', top=TOP):
+        '''Authors with the most citations over the papers selected.'''
+        data = self.select('authors.parquet', conferences, years, snapshot)
+        if data is None:
+            return None
+
+        return (data.groupby('author')
+                    .agg(name=('name', 'first'), papers=('title_key', 'size'), citations=('citations', 'sum'),
+                         cit_year=('cit_year', 'sum'), best_rank=('rank', 'min'))
+                    .sort_values('citations', ascending=False).head(top).reset_index(drop=True))
+
+    def top_papers(self, conferences=None, years=None, snapshot='latest', top=TOP):
+        '''Papers with the most citations per year over the papers selected.'''
+        data = self.select('titles.parquet', conferences, years, snapshot)
+        if data is None:
+            return None
+
+        return (data.sort_values('cit_year', ascending=False).head(top)
+                    [['conference', 'year', 'rank', 'title', 'citations', 'cit_year']].reset_index(drop=True))
+
+    def author(self, name, snapshot='latest'):
+        '''Papers of an author in every conference-year.'''
+        data = self.select('authors.parquet', snapshot=snapshot, filters=[('author', '==', normalize_title(name))])
+        if data is None or len(data) == 0:
+            return data
+
+        titles = self.read('titles.parquet', ['title_key', 'title', 'conference', 'year', 'snapshot'],
+                           [('title_key', 'in', list(data['title_key'].unique()))]).astype({'conference': str, 'snapshot': str})
+
+        return (data.merge(titles, on=['title_key', 'conference', 'year', 'snapshot'])
+                    .sort_values('citations', ascending=False)
+                    [['conference', 'year', 'rank', 'title', 'citations', 'cit_year']].reset_index(drop=True))
+
+    def growth(self, conferences=None, years=None, start='earliest', end='latest', top=TOP):
+        '''Papers that gained the most citations between two snapshots of their conference-year.'''
+        keys = ['title_key', 'conference', 'year']
+        columns = keys + ['title', 'citations', 'snapshot']
+        before = self.select('titles.parquet', conferences, years, start, columns)
+        after = self.select('titles.parquet', conferences, years, end, columns)
+        if before is None or after is None:
+            return None
+
+        data = after.merge(before[keys + ['citations', 'snapshot']], on=keys, suffixes=('', '_before'))
+        data['gain'] = data['citations'] - data['citations_before']
+        data['days'] = (self.pd.to_datetime(data['snapshot']) - self.pd.to_datetime(data['snapshot_before'])).dt.days
+
+        return (data.sort_values('gain', ascending=False).head(top)
+                    [['conference', 'year', 'title', 'citations_before', 'citations', 'gain', 'days']].reset_index(drop=True))
+
+    def rollups(self, conferences=None, years=None):
+        '''Totals, means and medians of every snapshot of the conference-years selected.'''
+        data = self.read('rollups.parquet')
+        if data is None:
+            return None
+        if conferences:
+            data = data[data['conference'].isin(conferences)]
+        if years:
+            data = data[(data['year'] >= years[0]) & (data['year'] <= years[1])]
+
+        return data.reset_index(drop=True)
+
+def write_parquet(data, path, row_group_size=None):
+    '''Write a Parquet file so that readers never see it half written.'''
+    tmp_path = path + '.tmp'
+    data.to_parquet(tmp_path, index=False, row_group_size=row_group_size)
+    os.replace(tmp_path, path)
+
+def parse_years(s):
+    '''Parse "2015-2020" or "2020" into a (first, last) range of years.'''
+    if not s:
+        return None
+
+    first, _, last = s.partition('-')
+    return int(first), int(last or first)
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the rankings of every run kept with "run.py --snapshots".')
+    parser.add_argument('query', type=str, choices=['top-authors', 'top-papers', 'author', 'growth', 'rollups'], help='"top-authors" and "top-papers" rank authors and papers over the conference-years selected, "author" lists the papers of --name, "growth" ranks papers by the citations gained between the --start and --end snapshots, and "rollups" lists the totals of every snapshot.')
+    parser.add_argument('--conferences', type=str, help='Comma-separated conferences, e.g. "CVPR,ICCV". (Default: every one)')
+    parser.add_argument('--years', type=str, help='Years, e.g. "2015-2020" or "2020". (Default: every one)')
+    parser.add_argument('--snapshot', type=str, default='latest', help='Snapshot of each conference-year: "latest", "earliest" or a date (YYYY-MM-DD). (Default: latest)')
+    parser.add_argument('--start', type=str, default='earliest', help='First snapshot for "growth". (Default: earliest)')
+    parser.add_argument('--end', type=str, default='latest', help='Last snapshot for "growth". (Default: latest)')
+    parser.add_argument('--name', type=str, help='Author for "author".')
+    parser.add_argument('--top', type=int, default=TOP, help='Rows to show. (Default: {})'.format(TOP))
+    parser.add_argument('--snapshots', type=str, default=SNAPSHOTS_DIR, help='Directory of the snapshots. (Default: {})'.format(SNAPSHOTS_DIR))
+    args = parser.parse_args()
+
+    conferences = args.conferences.split(',') if args.conferences else None
+    years = parse_years(args.years)
+    store = SnapshotStore(args.snapshots)
+    pd = import_module('pandas')
+
+    if args.query == 'top-authors':
+        result = store.top_authors(conferences, years, args.snapshot, args.top)
+    elif args.query == 'top-papers':
+        result = store.top_papers(conferences, years, args.snapshot, args.top)
+    elif args.query == 'author':
+        if not args.name:
+            parser.error('"author" needs --name.')
+        result = store.author(args.name, args.snapshot)
+    elif args.query == 'growth':
+        result = store.growth(conferences, years, args.start, args.end, args.top)
+    else:
+        result = store.rollups(conferences, years)
+
+    if result is None or len(result) == 0:
+        print("No rankings found in {}.".format(args.snapshots))
+        return
+
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200, 'display.max_colwidth', 60):
+        print(result)
+
+if __name__ == '__main__':
+    main()
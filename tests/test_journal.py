@@ -0,0 +1,74 @@
+import os
+
+from journal import Journal
+from papers import PaperTable
+
+def make_journal(tmp_path, n_resolved=3):
+    journal = Journal('CVPR', 2020, dirname=str(tmp_path), sync_every=2)
+    journal.start(PaperTable(['A', 'B', 'C', 'D'], ['W', 'X', 'Y', 'Z'], ['l0', 'l1', 'l2', 'l3']))
+    for idx in range(n_resolved):
+        journal.append(idx, 10 * (idx + 1), "")
+    journal.close()
+    return journal
+
+def test_replay(tmp_path):
+    papers = make_journal(tmp_path).replay()
+    assert papers.titles == ['W', 'X', 'Y', 'Z']
+    assert papers.citations == [10, 20, 30, None]
+    assert papers.n_resolved() == 3
+
+def test_replay_truncated_tail(tmp_path):
+    journal = make_journal(tmp_path)
+    size = os.path.getsize(journal.path)
+    with open(journal.path, 'r+b') as f:
+        f.truncate(size - 5) # Killed while writing the last record.
+
+    papers = journal.replay()
+    assert papers.citations == [10, 20, None, None]
+
+    # The tail is dropped, so that the next records are not appended to it.
+    with open(journal.path, 'rb') as f:
+        assert f.read().endswith(b'"etc": ""}\n')
+
+    journal.append(2, 31, "")
+    journal.append(3, 40, "")
+    journal.close()
+    assert journal.replay().citations == [10, 20, 31, 40]
+
+def test_replay_record_without_newline(tmp_path):
+    # A record cut right before its newline is not trusted either.
+    journal = make_journal(tmp_path)
+    with open(journal.path, 'r+b') as f:
+        f.truncate(os.path.getsize(journal.path) - 1)
+
+    assert journal.replay().citations == [10, 20, None, None]
+
+def test_replay_invalid_header(tmp_path):
+    journal = make_journal(tmp_path)
+    with open(journal.path, 'r+b') as f:
+        f.truncate(10)
+
+    assert journal.replay() is None
+
+def test_replay_incomplete_listing(tmp_path):
+    # The listing was interrupted: the papers are listed again, and those resolved are carried over (see Journal.carry).
+    journal = Journal('ECCV', 2020, dirname=str(tmp_path))
+    papers = PaperTable()
+    journal.start(papers, complete=False)
+    journal.add_papers(['A', 'B'], ['W', 'X'], ['l0', 'l1'])
+    journal.append(1, 20, "")
+    journal.close()
+
+    assert journal.replay() is None
+    assert journal.carried == {('l1', 'X'): (20, "")}
+
+    papers = PaperTable()
+    journal.start(papers, complete=False)
+    indices = papers.extend(['B', 'C'], ['X', 'Y'], ['l1', 'l2'])
+    journal.add_papers(['B', 'C'], ['X', 'Y'], ['l1', 'l2'])
+    journal.carry(papers, indices)
+    assert papers.citations == [20, None]
+
+    journal.complete()
+    journal.close()
+    assert journal.replay().citations == [20, None]
@@ -0,0 +1,21 @@
+from matching import last_names, author_overlap
+
+SNIPPET = 'K He, X Zhang, S Ren, J Sun'
+
+def test_last_names():
+    assert last_names('Kaiming He, Xiangyu Zhang, Shaoqing Ren and Jian Sun') == ['he', 'zhang', 'ren', 'sun']
+    assert last_names('He, Kaiming and Zhang, Xiangyu and Ren, Shaoqing and Sun, Jian') == ['he', 'zhang', 'ren', 'sun']
+    assert last_names('Van Gool, Luc and Timofte, Radu') == ['gool', 'timofte']
+    assert last_names('Kaiming He') == ['he']
+    assert last_names('') == []
+
+def test_author_overlap_both_formats():
+    assert author_overlap('Kaiming He, Xiangyu Zhang, Shaoqing Ren, Jian Sun', SNIPPET) == 1.
+    assert author_overlap('Kaiming He, Xiangyu Zhang, Shaoqing Ren and Jian Sun', SNIPPET) == 1.
+    assert author_overlap('He, Kaiming and Zhang, Xiangyu and Ren, Shaoqing and Sun, Jian', SNIPPET) == 1. # CVF bibref.
+
+def test_author_overlap_truncated_snippet():
+    # Only as many authors as the snippet lists are expected.
+    assert author_overlap('He, Kaiming and Zhang, Xiangyu and Ren, Shaoqing and Sun, Jian', 'K He, X Zhang') == 1.
+    assert author_overlap('He, Kaiming and Girshick, Ross', 'K He, X Zhang') == .5
+    assert author_overlap('Kaiming He', '') == 0.
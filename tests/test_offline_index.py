@@ -0,0 +1,65 @@
+import os, gzip, shutil
+
+import pytest
+
+from offline_index import OfflineIndex, extract_doi
+
+DUMP_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'works.jsonl')
+
+@pytest.fixture(params=['jsonl', 'jsonl.gz'])
+def index(request, tmp_path):
+    dump_path = DUMP_PATH
+    if request.param == 'jsonl.gz':
+        dump_path = str(tmp_path / 'works.jsonl.gz')
+        with open(DUMP_PATH, 'rb') as f, gzip.open(dump_path, 'wb') as g:
+            shutil.copyfileobj(f, g)
+
+    index = OfflineIndex(str(tmp_path / 'index.sqlite'), create=True)
+    assert index.ingest(dump_path, batch_size=2) == 7 # Blank lines and works without counts are skipped.
+    yield index
+    index.close()
+
+def test_doi_hit(index):
+    # OpenAlex DOI given as a URL, found by the DOI of a proceedings link in any case.
+    assert index.lookup('https://doi.org/10.1109/cvpr.2016.90', 'Another Title') == 150000
+    assert index.lookup('https://link.springer.com/chapter/10.1007/978-3-030-58452-8_13', '') == 8000
+
+def test_semantic_scholar_doi_hit(index):
+    assert index.lookup('https://arxiv.org/abs/10.48550/arXiv.1706.03762', '') == 85000
+    assert index.lookup('https://doi.org/10.1109/ICCV.2017.322', '') == 30000 # camelCase keys.
+
+def test_title_only_hit(index):
+    # No DOI in the link, or a DOI not indexed: found by the normalized title.
+    assert index.lookup('https://papers.nips.cc/paper/2020/hash/1457c0d6bfcb4967418bfb8ac142f64a-Abstract.html',
+                        'Language models are few-shot learners') == 20000
+    assert index.lookup('https://doi.org/10.1109/ICCV.2017.999', 'MASK R-CNN') == 30000
+
+def test_highest_count_kept(index):
+    # Three works share the title, one of them under its DOI as well.
+    assert index.lookup('', 'Attention Is All You Need') == 91000
+
+def test_miss(index):
+    assert index.lookup('https://doi.org/10.5555/no.count', 'A Work Without Counts') is None
+    assert index.lookup('https://example.org/paper', 'A Paper Nobody Wrote') is None
+    assert index.lookup('', '') is None
+
+def test_missing_or_empty_index(tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    with pytest.raises(ValueError, match='No offline index'):
+        OfflineIndex(path)
+    assert not os.path.exists(path) # Not created by a reader.
+
+    OfflineIndex(path, create=True).close()
+    with pytest.raises(ValueError, match='empty'):
+        OfflineIndex(path)
+
+    with open(path, 'w') as f:
+        f.write('Not a database.')
+    with pytest.raises(ValueError, match='empty'):
+        OfflineIndex(path)
+
+def test_extract_doi():
+    assert extract_doi('https://doi.org/10.1109/CVPR.2016.90') == '10.1109/cvpr.2016.90'
+    assert extract_doi('https://doi.org/10.1109/CVPR.2016.90.') == '10.1109/cvpr.2016.90'
+    assert extract_doi('https://openaccess.thecvf.com/content_cvpr_2016/html/He_Deep_Residual_CVPR_2016_paper.html') is None
+    assert extract_doi(None) is None
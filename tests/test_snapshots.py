@@ -0,0 +1,45 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+
+from snapshots import SnapshotStore
+
+N_PAPERS = 200 # Enough rows for pandas.to_datetime to cache the dates of a column.
+
+def ranking(titles, citations):
+    data = pd.DataFrame({'Author': ['A Kim, B Lee'] * len(titles), 'Title': titles, 'Citations': citations,
+                         'Source': ['https://example.org/{}'.format(i) for i in range(len(titles))], 'Etc': [''] * len(titles)})
+    data.index = pd.RangeIndex(1, len(titles) + 1, name='ID')
+    data.insert(4, 'cit/year', data['Citations'] // 2)
+    return data.sort_values('Citations', ascending=False)
+
+@pytest.fixture
+def store(tmp_path):
+    titles = ['CVPR Paper {}'.format(i) for i in range(N_PAPERS)]
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    store.append('CVPR', 2020, ranking(titles, [10 * i for i in range(N_PAPERS)]), snapshot='2026-01-01')
+    store.append('CVPR', 2020, ranking(titles, [11 * i for i in range(N_PAPERS)]), snapshot='2026-03-02')
+    # On the date of the latest CVPR snapshot: the earliest snapshots use every date, which pandas.to_datetime
+    # returns as categories for a categorical column.
+    store.append('NeurIPS', 2020, ranking(['NeurIPS Paper'], [10000]), snapshot='2026-03-02')
+    return store
+
+def test_growth_defaults(store):
+    growth = store.growth(top=1000)
+    assert len(growth) == N_PAPERS + 1
+    assert list(growth['title'][:2]) == ['CVPR Paper 199', 'CVPR Paper 198']
+    assert list(growth['gain'][:2]) == [199, 198]
+    assert set(growth['days']) == {60, 0} # NeurIPS has a single snapshot.
+
+def test_growth_dates(store):
+    growth = store.growth(['CVPR'], start='2026-01-15') # The latest snapshot on or before it is 2026-01-01.
+    assert growth['gain'].iloc[0] == 199
+    growth = store.growth(['CVPR'], start='2026-01-01', end='2026-02-15')
+    assert (growth['gain'] == 0).all()
+
+def test_top_authors_and_author(store):
+    top = store.top_authors()
+    assert list(top['name']) == ['A Kim', 'B Lee']
+    assert top['papers'].tolist() == [N_PAPERS + 1] * 2
+    assert store.author('a kim')['title'].iloc[0] == 'NeurIPS Paper'